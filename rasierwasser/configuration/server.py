@@ -1,4 +1,4 @@
-from typing import Dict, Any, TypeVar
+from typing import Dict, Any, TypeVar, Optional
 from pydantic import BaseModel, Field
 
 
@@ -7,10 +7,33 @@ class AuthConfig(BaseModel):
     parameter: Dict[str, Any] = Field(default_factory=dict)
 
 
+class IngestConfig(BaseModel):
+    staging_dir: str
+    workers: int = 2
+
+
+class AdmissionConfig(BaseModel):
+    """
+    Limits for requests admitted to the server. Uploads beyond max_concurrent_uploads wait in a queue of at most
+    max_queued_uploads entries for up to queue_timeout seconds. Uploads never take the last read_reserve of the
+    max_concurrent_requests slots, so downloads keep being served while uploads are saturated.
+    """
+    max_upload_bytes: int = 1 << 30
+    max_concurrent_requests: int = 256
+    read_reserve: int = 32
+    max_concurrent_uploads: int = 8
+    max_queued_uploads: int = 32
+    queue_timeout: float = 30.0
+    retry_after: int = 5
+
+
 class ServerConfig(BaseModel):
     hostname: str
     port: int
     debug: bool = False
+    ingest: Optional[IngestConfig] = None
+    admission: AdmissionConfig = Field(default_factory=AdmissionConfig)
+    download_flush_interval: float = 60.0
 
 
 SecurityScheme = TypeVar('SecurityScheme')
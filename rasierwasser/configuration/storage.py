@@ -1,12 +1,18 @@
-from typing import Dict, Tuple, Callable, Any, Type
+from typing import Dict, Tuple, Callable, Any, Type, Optional, List
 from pydantic import BaseModel, Field
 from rasierwasser.storage.algebra import Storage
 from rasierwasser.storage.database.engine import create_database_storage
+from rasierwasser.storage.memory.engine import create_memory_storage
+from rasierwasser.storage.cache import create_cached_storage
+from rasierwasser.storage.coalescing import create_coalescing_storage
+from rasierwasser.storage.sharding import create_sharded_storage
 
 
 class StorageBackend(BaseModel):
     backend: str
     parameter: Dict[str, Any]
+    cache_size: int = 0
+    coalesce: bool = False
 
 
 class DatabaseBackend(BaseModel):
@@ -15,10 +21,37 @@ class DatabaseBackend(BaseModel):
     options: Dict[str, str] = Field(default_factory=dict)
 
 
+class MemoryBackend(BaseModel):
+    verify: bool = True
+    snapshot: Optional[str] = None
+
+
+class ShardedBackend(BaseModel):
+    shards: List[StorageBackend]
+    workers: int = 8
+
+
+def create_shards_from_config(shards: List[Dict[str, Any]]) -> List[Storage]:
+    return [create_storage_from_config(StorageBackend(**shard)) for shard in shards]
+
+
+def create_sharded_storage_from_config(shards: List[Dict[str, Any]], workers: int = 8) -> Storage:
+    return create_sharded_storage(create_shards_from_config(shards), workers)
+
+
 _BACKEND_MAP: Dict[str, Tuple[Type[BaseModel], Callable[..., Storage]]] = {
-    'database': (DatabaseBackend, create_database_storage)
+    'database': (DatabaseBackend, create_database_storage),
+    'memory': (MemoryBackend, create_memory_storage),
+    'sharded': (ShardedBackend, create_sharded_storage_from_config)
 }
 
+
 def create_storage_from_config(config: StorageBackend) -> Storage:
-     config_type, create_backend = _BACKEND_MAP[config.backend]
-     return create_backend(**config_type(**config.parameter).dict())
+    config_type, create_backend = _BACKEND_MAP[config.backend]
+    storage: Storage = create_backend(**config_type(**config.parameter).dict())
+    if config.coalesce:
+        storage = create_coalescing_storage(storage)
+    if config.cache_size > 0:
+        storage = create_cached_storage(storage, config.cache_size)
+    return storage
+
@@ -1,13 +1,15 @@
 #!/usr/bin/env python3.9
 
-from typing import Dict, Any, Iterable, Pattern, Tuple, cast
+from typing import Dict, Any, Iterable, Iterator, List, Pattern, Tuple, Optional, cast
 from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha512
 from argparse import ArgumentParser
 from re import compile as compile_regex
 from yaml import safe_load
 from json import dump
 from pathlib import Path
-from os import scandir, DirEntry
+from os import scandir, walk, DirEntry
 from getpass import getpass
 from base64 import b64encode
 from OpenSSL.crypto import PKey, load_privatekey, FILETYPE_PEM, sign
@@ -15,25 +17,31 @@ from rasierwasser.storage.validation import get_normalised_package_content
 
 
 CONFIG_FILE_NAME: str = 'rasierwasser_config.yaml'
+MANIFEST_FILE_NAME: str = 'rasierwasser_manifest.json'
+SIGNATURE_SUFFIX: str = '.sig.json'
 PACKAGE_PATTERN: Pattern = compile_regex(r'.*-(?P<major>\d+)\.(?P<minor>\d+)\.(?P<build>\d+)')
 
 
+def read_config_file(target: Path) -> Dict[str, Any]:
+    with target.open('r', encoding='utf-8') as src:
+        config = dict(
+            **safe_load(src),
+            config_file=target.absolute().as_uri(),
+            package_dir=str(target.parent.absolute())
+        )
+        keyfile: Path = Path(config['keyfile'])
+        if not keyfile.is_absolute():
+            config['keyfile'] = target.parent.absolute().joinpath(keyfile)
+        return config
+
+
 def decent_until_config_found(current: Path) -> Dict[str, Any]:
     while True:
         current = current.absolute()
         target: Path = current.joinpath(CONFIG_FILE_NAME)
         if target.exists():
             print("Found configuration file here:", str(target))
-            with target.open('r', encoding='utf-8') as src:
-                config = dict(
-                    **safe_load(src),
-                    config_file=target.absolute().as_uri(),
-                    package_dir=str(target.parent.absolute())
-                )
-                keyfile: Path = Path(config['keyfile'])
-                if not keyfile.is_absolute():
-                    config['keyfile'] = Path(current).joinpath(keyfile)
-                return config
+            return read_config_file(target)
         next_decent: Path = current.parent
         if next_decent == current:
             raise FileNotFoundError(f'Could not find configuration file {CONFIG_FILE_NAME} in directory structure.')
@@ -41,6 +49,13 @@ def decent_until_config_found(current: Path) -> Dict[str, Any]:
             current = next_decent
 
 
+def find_config_files(root: Path) -> Iterator[Path]:
+    for directory, subdirectories, files in walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if not name.startswith('.'))
+        if CONFIG_FILE_NAME in files:
+            yield Path(directory).joinpath(CONFIG_FILE_NAME)
+
+
 def find_latest_package(package: Path) -> str:
     wheels: Iterable[DirEntry] = filter(lambda entry: entry.name.endswith('.whl'), scandir(package.joinpath('dist')))
     versions: Iterable[Tuple[int, int, int, Path]] = (
@@ -53,14 +68,108 @@ def find_latest_package(package: Path) -> str:
     return max(versions)[-1]
 
 
+def find_wheels(package: Path) -> List[str]:
+    dist: Path = package.joinpath('dist')
+    if not dist.is_dir():
+        return []
+    return sorted(entry.path for entry in scandir(dist) if entry.name.endswith('.whl'))
+
+
+def get_package_name(wheel: str) -> str:
+    return Path(wheel).name.rsplit('-', 4)[0]
+
+
+def load_private_key(keyfile: str, password: str) -> PKey:
+    with open(keyfile, 'rb') as src:
+        return load_privatekey(FILETYPE_PEM, src.read(), password.encode())
+
+
+_WORKER_PASSWORDS: Dict[str, str] = dict()
+_WORKER_PRIVATE_KEYS: Dict[str, PKey] = dict()
+
+
+def init_signing_worker(passwords: Dict[str, str]) -> None:
+    _WORKER_PASSWORDS.update(passwords)
+
+
+def sign_wheel(task: Tuple[str, str, str, str]) -> Dict[str, str]:
+    """
+    Signs one wheel inside a worker process and writes a detached signature next to it. Private keys are loaded
+    at most once per worker process.
+    """
+    wheel, keyfile, certificate, digest = task
+    if keyfile not in _WORKER_PRIVATE_KEYS:
+        _WORKER_PRIVATE_KEYS[keyfile] = load_private_key(keyfile, _WORKER_PASSWORDS[keyfile])
+    with open(wheel, 'rb') as src:
+        content: bytes = src.read()
+    detached: Dict[str, str] = dict(
+        package=get_package_name(wheel),
+        filename=Path(wheel).name,
+        signature_base64=b64encode(
+            sign(_WORKER_PRIVATE_KEYS[keyfile], get_normalised_package_content(content), digest)
+        ).decode('ascii'),
+        certificate=certificate,
+        hash_algorithm=digest
+    )
+    signature_file: str = f'{wheel}{SIGNATURE_SUFFIX}'
+    with open(signature_file, 'w', encoding='utf-8') as out:
+        dump(detached, out, ensure_ascii=False, indent=3)
+    return dict(**detached, path=wheel, signature_file=signature_file, content_sha512=sha512(content).hexdigest())
+
+
+def sign_batch(
+        root: Path,
+        manifest: Path,
+        password: Optional[str] = None,
+        keyfile_override: Optional[str] = None,
+        processes: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Signs every wheel in the dist directories of all projects below root that contain a configuration file.
+    Every private key is unlocked once, the wheels are signed by a process pool and the results are collected
+    in a single manifest.
+    """
+    tasks: List[Tuple[str, str, str, str]] = []
+    passwords: Dict[str, str] = dict()
+    for config_file in find_config_files(root):
+        config: Dict[str, Any] = read_config_file(config_file)
+        keyfile: str = str(keyfile_override if keyfile_override else config['keyfile'])
+        wheels: List[str] = find_wheels(Path(config['package_dir']))
+        if wheels and keyfile not in passwords:
+            passwords[keyfile] = password if password is not None else getpass(f'Password for {keyfile}: ')
+            load_private_key(keyfile, passwords[keyfile])
+        tasks.extend((wheel, keyfile, config['certificate'], config.get('digest', 'sha512')) for wheel in wheels)
+
+    print(f'Signing {len(tasks)} wheels with {len(passwords)} keys.')
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_signing_worker, initargs=(passwords, )) as pool:
+        entries: List[Dict[str, str]] = list(pool.map(sign_wheel, tasks))
+    with manifest.open('w', encoding='utf-8') as out:
+        dump(entries, out, ensure_ascii=False, indent=3)
+    return entries
+
+
 def main():
     parser: ArgumentParser = ArgumentParser(description='Sign and newest release for a python package')
     parser.add_argument('--package-dir', default='.', help='Path to python project.')
     parser.add_argument('--keyfile-override', default=None, help='Overrides keyfile in configuration file.')
     parser.add_argument('--password', default=None, help='Password for keyfile.')
     parser.add_argument('--out-dir', default=None, help='Alternative output dir for signature result.')
+    parser.add_argument(
+        '--batch-root', default=None,
+        help='Sign all wheels of all projects below this directory and write detached signatures and a manifest.'
+    )
+    parser.add_argument('--processes', type=int, default=None, help='Number of signing processes in batch mode.')
 
     args = parser.parse_args()
+    if args.batch_root:
+        output_dir: Path = Path(args.out_dir) if args.out_dir else Path(args.batch_root)
+        entries: List[Dict[str, str]] = sign_batch(
+            Path(args.batch_root), output_dir.joinpath(MANIFEST_FILE_NAME), args.password, args.keyfile_override,
+            args.processes
+        )
+        print(f'Signed {len(entries)} wheels, manifest written to {output_dir.joinpath(MANIFEST_FILE_NAME)}')
+        return
+
     config: Dict[str, Any] = decent_until_config_found(Path(args.package_dir))
     if args.keyfile_override:
         config['keyfile'] = args.keyfile_override
@@ -76,7 +185,7 @@ def main():
             (args.password if args.password is not None else getpass('Private key password: ')).encode()
         )
 
-    package: str = Path(target_wheel).name.rsplit('-', 4)[0]
+    package: str = get_package_name(target_wheel)
     signature: str = b64encode(sign(private_key, get_normalised_package_content(content), digest)).decode('ascii')
     output_path: Path = Path(args.out_dir) if args.out_dir else Path(config['package_dir'])
     with output_path.joinpath('rasierwasser_signature.json').open('w', encoding='utf-8') as out:
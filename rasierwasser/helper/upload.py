@@ -0,0 +1,164 @@
+from typing import Dict, List, Iterable, Iterator, Tuple, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from hashlib import sha512
+from json import load
+from os import walk
+from pathlib import Path
+from time import sleep
+from requests import Session, Response, RequestException
+from requests.adapters import HTTPAdapter
+from rasierwasser.helper.signing import MANIFEST_FILE_NAME, SIGNATURE_SUFFIX
+
+
+HASH_CHUNK_SIZE: int = 1 << 20
+MAX_ATTEMPTS: int = 5
+DEFAULT_RETRY_AFTER: int = 1
+RETRIED_STATUS_CODES: Tuple[int, ...] = (429, 503)
+
+UPLOADED: str = 'uploaded'
+SKIPPED: str = 'skipped'
+CONFLICT: str = 'conflict'
+FAILED: str = 'failed'
+
+
+def read_signature_file(signature_file: Path) -> Dict[str, str]:
+    with signature_file.open('r', encoding='utf-8') as src:
+        return dict(**load(src), path=str(signature_file.parent.joinpath(signature_file.name[:-len(SIGNATURE_SUFFIX)])))
+
+
+def collect_uploads(paths: Iterable[str]) -> List[Dict[str, str]]:
+    """
+    Collects upload entries from manifests written by rasierwasser_sign, from wheels with a detached signature
+    next to them and from directories containing such wheels.
+    """
+    uploads: List[Dict[str, str]] = []
+    for path in map(Path, paths):
+        if path.name == MANIFEST_FILE_NAME:
+            with path.open('r', encoding='utf-8') as src:
+                uploads.extend(load(src))
+        elif path.is_dir():
+            uploads.extend(
+                read_signature_file(Path(directory).joinpath(file))
+                for directory, _, files in walk(path)
+                for file in sorted(files)
+                if file.endswith(SIGNATURE_SUFFIX)
+            )
+        else:
+            signature_file: Path = path.with_name(f'{path.name}{SIGNATURE_SUFFIX}')
+            if not signature_file.exists():
+                raise FileNotFoundError(f'Found no detached signature for {path}: {signature_file}')
+            uploads.append(read_signature_file(signature_file))
+    return uploads
+
+
+def file_sha512(path: str) -> str:
+    digest = sha512()
+    with open(path, 'rb') as src:
+        for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_remote_digests(session: Session, url: str, package: str) -> Dict[str, str]:
+    with session.get(f'{url}/metadata/{package}') as response:
+        response.raise_for_status()
+        return dict((file['filename'], file['content_sha512']) for file in response.json())
+
+
+def response_detail(response: Response) -> str:
+    try:
+        return f"{response.status_code}: {response.json()['detail']}"
+    except (ValueError, KeyError, TypeError):
+        return f'{response.status_code}: {response.text}'
+
+
+def retry_delay(response: Response) -> int:
+    try:
+        return int(response.headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
+def put_file(session: Session, url: str, upload: Dict[str, str]) -> Tuple[str, Optional[str]]:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        with open(upload['path'], 'rb') as src:
+            with session.put(
+                f"{url}/packages/{upload['package']}/{upload['filename']}",
+                data=src,
+                headers={
+                    'Content-Type': 'application/octet-stream',
+                    'X-Rasierwasser-Certificate': upload['certificate'],
+                    'X-Rasierwasser-Signature': upload['signature_base64'],
+                    'X-Rasierwasser-Digest': upload.get('hash_algorithm', 'sha512')
+                }
+            ) as response:
+                if response.status_code not in RETRIED_STATUS_CODES or attempt == MAX_ATTEMPTS:
+                    if response.status_code == 409:
+                        return CONFLICT, response_detail(response)
+                    if not response.ok:
+                        return FAILED, response_detail(response)
+                    return UPLOADED, None
+                delay: int = retry_delay(response)
+        sleep(delay)
+
+
+def upload_file(
+        session: Session,
+        url: str,
+        upload: Dict[str, str],
+        remote: Dict[str, Dict[str, str]]
+) -> Tuple[str, Optional[str]]:
+    """
+    Streams a single wheel from disk to the server, unless a file with the same name is already known. Returns
+    whether the file was uploaded, skipped as identical, conflicts with a different file of the same name or
+    failed, together with the reason reported by the server. Uploads rejected for capacity are repeated after the
+    delay requested by the server, at most MAX_ATTEMPTS times.
+    """
+    known_digest: str = remote[upload['package']].get(upload['filename'])
+    if known_digest is not None:
+        local_digest: str = upload['content_sha512'] if 'content_sha512' in upload else file_sha512(upload['path'])
+        return (SKIPPED, None) if known_digest == local_digest else (CONFLICT, 'Remote file has a different digest')
+    try:
+        return put_file(session, url, upload)
+    except (OSError, RequestException) as error:
+        return FAILED, str(error)
+
+
+def upload_files(
+        url: str,
+        uploads: List[Dict[str, str]],
+        concurrency: int = 4,
+        skip_existing: bool = True
+) -> Iterator[Tuple[Dict[str, str], str, Optional[str]]]:
+    """
+    Uploads all files over one keep-alive session with at most concurrency uploads in flight and yields every
+    upload together with its outcome and the reason of a conflict or failure as soon as it is finished.
+    """
+    url = url.rstrip('/')
+    with Session() as session:
+        session.mount(url, HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            packages: List[str] = sorted(set(upload['package'] for upload in uploads))
+            remote: Dict[str, Dict[str, str]] = dict(
+                zip(
+                    packages,
+                    pool.map(lambda package: get_remote_digests(session, url, package), packages)
+                    if skip_existing else (dict() for _ in packages)
+                )
+            )
+            pending: Dict[Future, Dict[str, str]] = dict(
+                (pool.submit(upload_file, session, url, upload, remote), upload) for upload in uploads
+            )
+            for finished in as_completed(pending):
+                yield (pending[finished], *finished.result())
+
+
+def start_upload(url: str, paths: Iterable[str], concurrency: int = 4, skip_existing: bool = True) -> None:
+    outcomes: Counter = Counter()
+    for upload, outcome, detail in upload_files(url, collect_uploads(paths), concurrency, skip_existing):
+        outcomes[outcome] += 1
+        print(f"{outcome}: {upload['package']}/{upload['filename']}" + (f' ({detail})' if detail else ''))
+    print(', '.join(f'{count} {outcome}' for outcome, count in sorted(outcomes.items())))
+    if outcomes[CONFLICT] or outcomes[FAILED]:
+        raise SystemExit(1)
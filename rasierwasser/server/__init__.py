@@ -1,10 +1,15 @@
-from typing import TypeVar
+from typing import TypeVar, Optional
 from rasierwasser.server.fastapi.fastapi import create_fastapi_server
 from rasierwasser.storage.algebra import Storage
-from rasierwasser.configuration.main import AuthConfig, DEFAULT_AUTH_CONFIG
+from rasierwasser.configuration.main import AuthConfig, ServerConfig, DEFAULT_AUTH_CONFIG
 
 WSGIServer = TypeVar('WSGIServer')
 
 
-def default_server(storage: Storage, debug: bool = False, auth: AuthConfig = DEFAULT_AUTH_CONFIG) -> WSGIServer:
-    return create_fastapi_server(storage, debug, auth)
\ No newline at end of file
+def default_server(
+        storage: Storage,
+        debug: bool = False,
+        auth: AuthConfig = DEFAULT_AUTH_CONFIG,
+        server_config: Optional[ServerConfig] = None
+) -> WSGIServer:
+    return create_fastapi_server(storage, debug, auth, server_config)
\ No newline at end of file
@@ -0,0 +1,56 @@
+from typing import Dict, Tuple, Optional
+from datetime import datetime
+from threading import Lock, Thread, Event
+from rasierwasser.storage.algebra import Storage, PackageName, FileName, DownloadCount
+
+
+CounterKey = Tuple[PackageName, FileName, datetime]
+
+
+class DownloadCounter:
+    """
+    Counts downloads per file and hour in memory and adds them to the storage in one batch every interval seconds
+    and on shutdown, so serving a download never waits for a database write. Counts which could not be written are
+    kept for the next flush.
+    """
+
+    def __init__(self, storage: Storage, interval: float) -> None:
+        self._storage: Storage = storage
+        self._interval: float = interval
+        self._counts: Dict[CounterKey, int] = dict()
+        self._lock: Lock = Lock()
+        self._stopped: Event = Event()
+        self._thread: Optional[Thread] = None
+
+    def record(self, package: PackageName, file: FileName) -> None:
+        key: CounterKey = (package, file, datetime.utcnow().replace(minute=0, second=0, microsecond=0))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def flush(self) -> None:
+        with self._lock:
+            counts: Dict[CounterKey, int] = self._counts
+            self._counts = dict()
+        if not counts:
+            return
+        try:
+            self._storage.record_downloads([DownloadCount(*key, downloads) for key, downloads in counts.items()])
+        except Exception as error:
+            print(f'Could not write download statistics, will retry: {error}')
+            with self._lock:
+                for key, downloads in counts.items():
+                    self._counts[key] = self._counts.get(key, 0) + downloads
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.flush()
+
+    def start(self) -> None:
+        self._thread = Thread(target=self.run, name='rasierwasser-downloads', daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
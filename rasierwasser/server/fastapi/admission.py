@@ -0,0 +1,138 @@
+from typing import Optional, Dict
+from asyncio import Condition, wait_for, TimeoutError
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from starlette.responses import JSONResponse
+from rasierwasser.configuration.server import AdmissionConfig
+
+
+UPLOAD_METHODS = ('POST', 'PUT')
+UPLOAD_PATH_PREFIX: str = '/packages'
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code: int = status_code
+        self.detail: str = detail
+
+
+def is_upload(scope: Scope) -> bool:
+    return scope['method'] in UPLOAD_METHODS and scope['path'].startswith(UPLOAD_PATH_PREFIX)
+
+
+def get_content_length(scope: Scope) -> Optional[int]:
+    for name, value in scope['headers']:
+        if name == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class AdmissionController:
+    """
+    Counts the requests in flight and decides whether a new one is admitted. All methods have to be called from the
+    event loop of the server.
+    """
+
+    def __init__(self, config: AdmissionConfig) -> None:
+        self.config: AdmissionConfig = config
+        self.requests: int = 0
+        self.uploads: int = 0
+        self.queued: int = 0
+        self._released: Optional[Condition] = None
+
+    @property
+    def released(self) -> Condition:
+        if self._released is None:
+            self._released = Condition()
+        return self._released
+
+    def can_start_upload(self) -> bool:
+        return (
+            self.uploads < self.config.max_concurrent_uploads
+            and self.requests < self.config.max_concurrent_requests - self.config.read_reserve
+        )
+
+    def acquire_read(self) -> None:
+        if self.requests >= self.config.max_concurrent_requests:
+            raise Rejected(503, 'Server is at capacity.')
+        self.requests += 1
+
+    async def acquire_upload(self) -> None:
+        if not self.can_start_upload():
+            if self.queued >= self.config.max_queued_uploads:
+                raise Rejected(429, 'Too many uploads in progress.')
+            self.queued += 1
+            try:
+                async with self.released:
+                    await wait_for(self.released.wait_for(self.can_start_upload), self.config.queue_timeout)
+            except TimeoutError:
+                raise Rejected(503, 'Timed out waiting for an upload slot.')
+            finally:
+                self.queued -= 1
+        self.requests += 1
+        self.uploads += 1
+
+    async def release(self, upload: bool) -> None:
+        self.requests -= 1
+        if upload:
+            self.uploads -= 1
+        async with self.released:
+            self.released.notify_all()
+
+
+class AdmissionMiddleware:
+    """
+    Rejects requests early instead of letting them exhaust the memory of the server: bodies larger than
+    max_upload_bytes are answered with 413 while they are streamed, uploads beyond the queue with 429 and requests
+    which can not be served in time with 503. Rejections for capacity carry a Retry-After header.
+    """
+
+    def __init__(self, app: ASGIApp, config: AdmissionConfig) -> None:
+        self.app: ASGIApp = app
+        self.controller: AdmissionController = AdmissionController(config)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        config: AdmissionConfig = self.controller.config
+        content_length: Optional[int] = get_content_length(scope)
+        if content_length is not None and content_length > config.max_upload_bytes:
+            await self.reject(scope, receive, send, Rejected(413, 'Request body too large.'))
+            return
+
+        upload: bool = is_upload(scope)
+        try:
+            if upload:
+                await self.controller.acquire_upload()
+            else:
+                self.controller.acquire_read()
+        except Rejected as rejection:
+            await self.reject(scope, receive, send, rejection)
+            return
+
+        received: int = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message: Message = await receive()
+            received += len(message.get('body', b''))
+            if received > config.max_upload_bytes:
+                raise HTTPException(413, 'Request body too large.')
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            await self.controller.release(upload)
+
+    async def reject(self, scope: Scope, receive: Receive, send: Send, rejection: Rejected) -> None:
+        headers: Dict[str, str] = dict()
+        if rejection.status_code != 413:
+            headers['Retry-After'] = str(self.controller.config.retry_after)
+        await JSONResponse(dict(detail=rejection.detail), rejection.status_code, headers=headers)(scope, receive, send)
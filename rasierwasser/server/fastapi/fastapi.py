@@ -1,13 +1,25 @@
-from typing import List, Optional
+from typing import Optional, List, BinaryIO
 from datetime import datetime
-from jinja2 import Template
-from pkg_resources import resource_string
-from fastapi import FastAPI, Depends, HTTPException
+from json import dumps
+from base64 import b64decode
+from pathlib import Path
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
 from pydantic import BaseModel
-from starlette.responses import Response, HTMLResponse
-from rasierwasser.storage.algebra import PackageData, CertificateData, Storage, PackageName, FileName
-from rasierwasser.configuration.server import AuthConfig, DEFAULT_AUTH_CONFIG
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, HTMLResponse, JSONResponse, StreamingResponse
+from rasierwasser.storage.algebra import PackageData, CertificateData, Storage, PackageName, FileName, ChangeFeed
+from rasierwasser.configuration.server import AuthConfig, ServerConfig, DEFAULT_AUTH_CONFIG
 from rasierwasser.server.fastapi.auth import parse_auth_config, AuthPolicy
+from rasierwasser.server.fastapi.admission import AdmissionMiddleware
+from rasierwasser.server.templates import render_base_index, render_package_index
+from rasierwasser.storage.coalescing import SingleFlight
+from rasierwasser.server.ingest import IngestQueue, IngestJob
+from rasierwasser.server.downloads import DownloadCounter
+
+
+MAX_CHANGE_FEED_LIMIT: int = 1000
+NDJSON_CONTENT_TYPE: str = 'application/x-ndjson'
+DEFAULT_FLUSH_INTERVAL: float = 60.0
 
 
 class CertificateUpload(BaseModel):
@@ -27,55 +39,156 @@ class FileUpload(BaseModel):
 def create_fastapi_server(
         storage: Storage,
         debug: bool = False,
-        auth_config: AuthConfig = DEFAULT_AUTH_CONFIG
+        auth_config: AuthConfig = DEFAULT_AUTH_CONFIG,
+        server_config: Optional[ServerConfig] = None
 ) -> FastAPI:
 
     app: FastAPI = FastAPI(debug=debug)
     auth: AuthPolicy = parse_auth_config(auth_config)
+    metadata_flight: SingleFlight = SingleFlight()
+    ingest: Optional[IngestQueue] = None
+    if server_config is not None and server_config.ingest is not None:
+        ingest = IngestQueue(storage, Path(server_config.ingest.staging_dir), server_config.ingest.workers)
+        app.add_event_handler('startup', ingest.start)
+        app.add_event_handler('shutdown', ingest.shutdown)
+    if server_config is not None:
+        app.add_middleware(AdmissionMiddleware, config=server_config.admission)
+    downloads: DownloadCounter = DownloadCounter(
+        storage, server_config.download_flush_interval if server_config is not None else DEFAULT_FLUSH_INTERVAL
+    )
+    app.add_event_handler('startup', downloads.start)
+    app.add_event_handler('shutdown', downloads.shutdown)
 
     @app.get('/packages')
     def base_index() -> HTMLResponse:
-        index: Template = Template(resource_string('rasierwasser', 'server/data/base_index.html').decode('utf-8'))
-        packages: List[str] = sorted(storage.packages())
-        return HTMLResponse(index.render(packages=packages))
+        return HTMLResponse(render_base_index(storage.packages()))
 
     @app.get('/packages/{package}')
     def package_index(package: str) -> HTMLResponse:
-        index: Template = Template(resource_string('rasierwasser', 'server/data/package_index.html').decode('utf-8'))
-        files: List[str] = sorted(file.file_name for file in storage.index(package))
-        return HTMLResponse(index.render(files=files, package=package))
+        return HTMLResponse(render_package_index(package, (file.file_name for file in storage.index(package))))
 
     @app.get('/packages/{package}/{file}')
     def download_file(package: PackageName, file: FileName) -> Response:
-        return Response(storage.retrieve(package, file).file_content, media_type='application/octet-stream')
+        content: bytes = storage.retrieve(package, file).file_content
+        downloads.record(package, file)
+        return Response(content, media_type='application/octet-stream')
 
     @app.get('/metadata')
     async def base_index_metadata():
         return sorted(storage.packages())
 
     @app.get('/metadata/{package}')
-    async def index(package: PackageName):
-        return list(map(PackageData.canonical, storage.index(package)))
+    def index(package: PackageName, content: bool = False):
+        if content:
+            return StreamingResponse(
+                (
+                    dumps(storage.retrieve(package, record.file_name).canonical()).encode('utf-8') + b'\n'
+                    for record in storage.index(package)
+                ),
+                media_type=NDJSON_CONTENT_TYPE
+            )
+        return metadata_flight.do(package, lambda: [record.canonical() for record in storage.index(package)])
 
-    @app.post('/packages', status_code=201)
-    async def upload_file(upload: FileUpload):
+    def store_upload(package: PackageData) -> None:
         try:
-            storage.store(
-                PackageData.from_base64(
-                    upload.package, upload.filename, upload.content_base64, upload.signature_base64,
-                    upload.certificate, upload.hash_algorithm
-                )
-            )
+            storage.store(package)
         except PermissionError:
             raise HTTPException(403)
+        except FileExistsError as error:
+            raise HTTPException(409, f'File already exists: {error}')
+        except FileNotFoundError as error:
+            raise HTTPException(422, str(error))
         except ValueError as error:
             raise HTTPException(422, str(error))
 
+    async def stage_content(job: IngestJob, request: Request) -> None:
+        """
+        Writes the streamed body of an upload to the staging directory. All file operations run in the thread pool,
+        so slow disks do not stall the event loop.
+        """
+        path: Path = ingest.content_path(job.job_id)
+        out: BinaryIO = await run_in_threadpool(path.open, 'wb')
+        try:
+            async for chunk in request.stream():
+                await run_in_threadpool(out.write, chunk)
+        except BaseException:
+            out.close()
+            path.unlink()
+            raise
+        await run_in_threadpool(out.close)
+
+    async def accept_job(job: IngestJob) -> JSONResponse:
+        await run_in_threadpool(ingest.submit, job)
+        return JSONResponse(
+            dict(job_id=job.job_id, state=job.state), status_code=202, headers=dict(Location=f'/jobs/{job.job_id}')
+        )
+
+    @app.post('/packages', status_code=201)
+    async def upload_file(upload: FileUpload):
+        if ingest is not None:
+            try:
+                content: bytes = b64decode(upload.content_base64)
+            except ValueError as error:
+                raise HTTPException(422, f'Upload is not valid base64: {error}')
+            job: IngestJob = ingest.create_job(
+                upload.package, upload.filename, upload.certificate, upload.signature_base64, upload.hash_algorithm
+            )
+            await run_in_threadpool(ingest.content_path(job.job_id).write_bytes, content)
+            return await accept_job(job)
+        try:
+            package: PackageData = PackageData.from_base64(
+                upload.package, upload.filename, upload.content_base64, upload.signature_base64,
+                upload.certificate, upload.hash_algorithm
+            )
+        except ValueError as error:
+            raise HTTPException(422, f'Upload is not valid base64: {error}')
+        await run_in_threadpool(store_upload, package)
+
+    @app.put('/packages/{package}/{file}', status_code=201)
+    async def upload_file_content(
+            package: PackageName,
+            file: FileName,
+            request: Request,
+            x_rasierwasser_certificate: str = Header(...),
+            x_rasierwasser_signature: str = Header(...),
+            x_rasierwasser_digest: str = Header('sha512')
+    ):
+        try:
+            signature: bytes = b64decode(x_rasierwasser_signature, validate=True)
+        except ValueError:
+            raise HTTPException(422, 'Signature is not valid base64.')
+        if ingest is not None:
+            job: IngestJob = ingest.create_job(
+                package, file, x_rasierwasser_certificate, x_rasierwasser_signature, x_rasierwasser_digest
+            )
+            await stage_content(job, request)
+            return await accept_job(job)
+        chunks: List[bytes] = []
+        async for chunk in request.stream():
+            chunks.append(chunk)
+        await run_in_threadpool(
+            store_upload,
+            PackageData(
+                package_name=package, file_name=file, file_content=b''.join(chunks),
+                signature=signature, certificate=x_rasierwasser_certificate,
+                digest=x_rasierwasser_digest
+            )
+        )
+
+    @app.get('/jobs/{job_id}')
+    def job_status(job_id: str):
+        if ingest is None:
+            raise HTTPException(404, 'Asynchronous ingest is not enabled.')
+        try:
+            return ingest.status(job_id)
+        except FileNotFoundError:
+            raise HTTPException(404, f'Unknown job: {job_id}')
+
     @app.get('/activities/packages')
     async def activities(begin: Optional[datetime] = None, end: Optional[datetime] = None):
         begin = begin if begin else datetime.min
         end = end if end else datetime.max
-        return storage.package_activities(begin, end)
+        return [activity._asdict() for activity in storage.package_activities(begin, end)]
 
     @app.get('/activities/certificates')
     async def certificate_activities(begin: Optional[datetime] = None, end: Optional[datetime] = None):
@@ -96,6 +209,33 @@ def create_fastapi_server(
         )
 
 
+    @app.get('/changes')
+    def change_feed(cursor: str = '', limit: int = 100):
+        if not 0 < limit <= MAX_CHANGE_FEED_LIMIT:
+            raise HTTPException(422, f'Limit has to be between 1 and {MAX_CHANGE_FEED_LIMIT}')
+        try:
+            feed: ChangeFeed = storage.changes(cursor, limit)
+        except ValueError:
+            raise HTTPException(422, f'Invalid cursor: {cursor}')
+        return dict(changes=[change.canonical() for change in feed.changes], cursor=feed.cursor)
+
+    @app.get('/stats/downloads')
+    def download_statistics(
+            begin: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            package: Optional[PackageName] = None
+    ):
+        return [
+            count._asdict()
+            for count in storage.download_statistics(
+                begin if begin else datetime.min, end if end else datetime.max, package
+            )
+        ]
+
+    @app.get('/stats/cache')
+    async def cache_statistics():
+        return storage.statistics() if storage.statistics else dict()
+
     @app.get('/certificates')
     async def get_certificates():
         return dict(
@@ -114,6 +254,22 @@ def create_fastapi_server(
             raise HTTPException(403)
         storage.add_certificate(CertificateData.from_base64(certificate.name, certificate.public_key_base64))
 
+    @app.post('/certificates/{name}/compromise')
+    def compromise_certificate(
+            name: str,
+            compromised: Optional[datetime] = None,
+            credentials: auth.credential_type = Depends(auth.security)
+    ):
+        try:
+            auth.check_credentials(credentials)
+        except PermissionError:
+            raise HTTPException(403)
+        try:
+            quarantined: int = storage.compromise_certificate(name, compromised if compromised else datetime.utcnow())
+        except FileNotFoundError:
+            raise HTTPException(404, f'Unknown certificate: {name}')
+        return dict(certificate=name, quarantined=quarantined)
+
     return app
 
 
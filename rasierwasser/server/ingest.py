@@ -0,0 +1,167 @@
+from typing import Dict, Optional
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+from base64 import b64decode
+from hashlib import sha512
+from os import replace
+from time import sleep
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from rasierwasser.storage.algebra import Storage, PackageData, PackageName, FileName
+
+
+QUEUED: str = 'queued'
+VERIFYING: str = 'verifying'
+PUBLISHED: str = 'published'
+REJECTED: str = 'rejected'
+FAILED: str = 'failed'
+
+MAX_ATTEMPTS: int = 5
+RETRY_DELAY: float = 0.5
+
+PENDING_STATES = (QUEUED, VERIFYING)
+
+
+class IngestJob(BaseModel):
+    job_id: str
+    package: PackageName
+    filename: FileName
+    certificate: str
+    signature_base64: str
+    hash_algorithm: str = 'sha512'
+    state: str = QUEUED
+    detail: Optional[str] = None
+    created: datetime
+    updated: datetime
+
+
+class IngestQueue:
+    """
+    Accepts uploads into a staging directory and publishes them into the storage with a bounded pool of background
+    workers. The state of every job is persisted next to its staged content, so accepted uploads which have not
+    been published yet are picked up again after a restart.
+    """
+
+    def __init__(self, storage: Storage, staging_dir: Path, workers: int = 2) -> None:
+        self._storage: Storage = storage
+        self._staging_dir: Path = staging_dir
+        self._workers: int = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, IngestJob] = dict()
+        self._lock: Lock = Lock()
+
+    def start(self) -> None:
+        self._staging_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='rasierwasser-ingest')
+        for state_file in sorted(self._staging_dir.glob('*.json')):
+            job: IngestJob = IngestJob.parse_file(state_file)
+            if job.state in PENDING_STATES:
+                print(f'Resuming ingest of {job.package}/{job.filename} ({job.job_id})')
+                self.submit(job, resumed=job.state == VERIFYING)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def content_path(self, job_id: str) -> Path:
+        return self._staging_dir.joinpath(f'{job_id}.upload')
+
+    def state_path(self, job_id: str) -> Path:
+        return self._staging_dir.joinpath(f'{job_id}.json')
+
+    def create_job(
+            self,
+            package: PackageName,
+            filename: FileName,
+            certificate: str,
+            signature_base64: str,
+            hash_algorithm: str
+    ) -> IngestJob:
+        """
+        Creates a new job, its content has to be written to content_path before it is submitted.
+        """
+        now: datetime = datetime.utcnow()
+        return IngestJob(
+            job_id=uuid4().hex, package=package, filename=filename, certificate=certificate,
+            signature_base64=signature_base64, hash_algorithm=hash_algorithm, created=now, updated=now
+        )
+
+    def submit(self, job: IngestJob, resumed: bool = False) -> None:
+        """
+        Queues a job for publishing. Resumed jobs have already been verifying before a restart, so their file may
+        have been stored already.
+        """
+        self._save(job)
+        self._executor.submit(self._process, job.job_id, resumed)
+
+    def status(self, job_id: str) -> IngestJob:
+        with self._lock:
+            job: Optional[IngestJob] = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not job_id.isalnum() or not self.state_path(job_id).exists():
+            raise FileNotFoundError(f'Found no ingest job with id: {job_id}')
+        return IngestJob.parse_file(self.state_path(job_id))
+
+    def _save(self, job: IngestJob) -> None:
+        temporary: Path = self._staging_dir.joinpath(f'{job.job_id}.json.tmp')
+        temporary.write_text(job.json(), encoding='utf-8')
+        replace(temporary, self.state_path(job.job_id))
+        with self._lock:
+            if job.state in PENDING_STATES:
+                self._jobs[job.job_id] = job
+            else:
+                self._jobs.pop(job.job_id, None)
+
+    def _update(self, job: IngestJob, state: str, detail: Optional[str] = None) -> IngestJob:
+        job = job.copy(update=dict(state=state, detail=detail, updated=datetime.utcnow()))
+        self._save(job)
+        return job
+
+    def _is_stored(self, job: IngestJob, content: bytes) -> bool:
+        try:
+            stored: PackageData = self._storage.retrieve(job.package, job.filename)
+        except FileNotFoundError:
+            return False
+        return stored.content_hexdigest() == sha512(content).hexdigest()
+
+    def _publish(self, job: IngestJob, resumed: bool) -> IngestJob:
+        try:
+            content: bytes = self.content_path(job.job_id).read_bytes()
+            self._storage.store(
+                PackageData(
+                    package_name=job.package, file_name=job.filename, file_content=content,
+                    signature=b64decode(job.signature_base64), certificate=job.certificate, digest=job.hash_algorithm
+                )
+            )
+        except PermissionError:
+            return self._update(job, REJECTED, 'Permission denied.')
+        except FileExistsError as error:
+            if resumed and self._is_stored(job, content):
+                return self._update(job, PUBLISHED)
+            return self._update(job, REJECTED, f'File already exists: {error}')
+        except (FileNotFoundError, ValueError) as error:
+            return self._update(job, REJECTED, str(error))
+        return self._update(job, PUBLISHED)
+
+    def _process(self, job_id: str, resumed: bool) -> None:
+        """
+        Publishes a job. Unexpected storage errors, like a locked database, are retried with exponential backoff
+        starting at RETRY_DELAY seconds, after MAX_ATTEMPTS attempts the job is marked as failed. A store can fail
+        after it has been committed, so resumed jobs and retries which find an identical file are published.
+        """
+        job: IngestJob = self._update(self.status(job_id), VERIFYING)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                job = self._publish(job, resumed or attempt > 1)
+                break
+            except Exception as error:
+                print(f'Could not ingest {job.package}/{job.filename} ({job_id}), attempt {attempt}: {error}')
+                if attempt == MAX_ATTEMPTS:
+                    job = self._update(job, FAILED, str(error))
+                else:
+                    job = self._update(job, VERIFYING, str(error))
+                    sleep(RETRY_DELAY * 2 ** (attempt - 1))
+        self.content_path(job_id).unlink()
@@ -0,0 +1,41 @@
+from typing import Iterable, Dict, Any, Tuple
+from functools import lru_cache
+from jinja2 import Template
+from pkg_resources import resource_string
+
+
+PEP691_CONTENT_TYPE: str = 'application/vnd.pypi.simple.v1+json'
+PEP691_META: Dict[str, str] = {'api-version': '1.0'}
+
+
+@lru_cache(maxsize=None)
+def load_template(name: str) -> Template:
+    return Template(resource_string('rasierwasser', f'server/data/{name}').decode('utf-8'))
+
+
+def render_base_index(packages: Iterable[str]) -> str:
+    return load_template('base_index.html').render(packages=sorted(packages))
+
+
+def render_package_index(package: str, files: Iterable[str]) -> str:
+    return load_template('package_index.html').render(files=sorted(files), package=package)
+
+
+def base_index_json(packages: Iterable[str]) -> Dict[str, Any]:
+    return dict(meta=PEP691_META, projects=[dict(name=package) for package in sorted(packages)])
+
+
+def package_index_json(package: str, files: Iterable[Tuple[str, Dict[str, str]]]) -> Dict[str, Any]:
+    """
+    Args:
+        package: Name of the package.
+        files: Pairs of file name and a mapping from hash algorithm to hex digest of the file content.
+    """
+    return dict(
+        meta=PEP691_META,
+        name=package,
+        files=[
+            dict(filename=file, url=f'/packages/{package}/{file}', hashes=hashes)
+            for file, hashes in sorted(files)
+        ]
+    )
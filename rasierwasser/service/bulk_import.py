@@ -0,0 +1,161 @@
+from typing import Dict, List, Set, Optional, Tuple, Iterator, Deque
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, Future
+from base64 import b64decode
+from hashlib import sha512
+from json import loads, dumps
+from pathlib import Path
+from time import monotonic
+from rasierwasser.storage.algebra import Storage, PackageData, CertificateData
+from rasierwasser.storage.validation import verify_package_data
+from rasierwasser.helper.upload import collect_uploads
+from rasierwasser.configuration.storage import create_storage_from_config
+from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+
+
+IMPORTED: str = 'imported'
+SKIPPED: str = 'skipped'
+REJECTED: str = 'rejected'
+
+_WORKER_CERTIFICATES: Dict[str, CertificateData] = dict()
+_WORKER_VERIFY: bool = True
+
+
+def init_import_worker(certificates: Dict[str, CertificateData], verify: bool) -> None:
+    global _WORKER_VERIFY
+    _WORKER_CERTIFICATES.update(certificates)
+    _WORKER_VERIFY = verify
+
+
+def get_upload_key(upload: Dict[str, str]) -> str:
+    return f'{upload["package"]}/{upload["filename"]}'
+
+
+def prepare_upload(upload: Dict[str, str]) -> Tuple[Optional[PackageData], Optional[str]]:
+    """
+    Reads, hashes and verifies one wheel inside a worker process. Returns the package ready to be stored or the
+    reason why it was rejected.
+    """
+    try:
+        content: bytes = Path(upload['path']).read_bytes()
+        content_sha512: str = sha512(content).hexdigest()
+        if upload.get('content_sha512', content_sha512) != content_sha512:
+            return None, 'Content does not match the digest in the manifest'
+        package: PackageData = PackageData(
+            package_name=upload['package'], file_name=upload['filename'], file_content=content,
+            signature=b64decode(upload['signature_base64']), certificate=upload['certificate'],
+            digest=upload.get('hash_algorithm', 'sha512'), content_sha512=content_sha512
+        )
+        if _WORKER_VERIFY:
+            if package.certificate not in _WORKER_CERTIFICATES:
+                return None, f'Found no certificate with name: {package.certificate}'
+            verify_package_data(package, _WORKER_CERTIFICATES[package.certificate])
+    except (OSError, ValueError) as error:
+        return None, str(error)
+    return package, None
+
+
+def load_checkpoint(checkpoint: Path) -> Set[str]:
+    """
+    Reads the keys of all imported files. The checkpoint holds one JSON list of keys per line and batch. A last
+    line which was cut short by an interrupted import is dropped, so the next batch starts on a line of its own.
+    """
+    imported: Set[str] = set()
+    if not checkpoint.exists():
+        return imported
+    with checkpoint.open('rb+') as src:
+        position: int = 0
+        for line in src:
+            try:
+                imported.update(loads(line))
+            except ValueError:
+                src.truncate(position)
+                break
+            position += len(line)
+            if not line.endswith(b'\n'):
+                src.write(b'\n')
+    return imported
+
+
+def append_checkpoint(checkpoint: Path, keys: List[str]) -> None:
+    with checkpoint.open('a', encoding='utf-8') as out:
+        out.write(f'{dumps(keys, ensure_ascii=False)}\n')
+
+
+def import_files(
+        storage: Storage,
+        uploads: List[Dict[str, str]],
+        checkpoint: Path,
+        batch_size: int = 100,
+        processes: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Imports wheels with detached signatures directly into the storage. Wheels are read, hashed and verified by a
+    process pool and stored in batches of batch_size files per transaction. After every batch the imported files
+    are appended to the checkpoint, so an interrupted import continues where it stopped. Only a bounded number of
+    wheels is held in memory at a time.
+    """
+    imported: Set[str] = load_checkpoint(checkpoint)
+    pending: List[Dict[str, str]] = [upload for upload in uploads if get_upload_key(upload) not in imported]
+    certificates: Dict[str, CertificateData] = dict(
+        (certificate.name, certificate) for certificate in storage.certificates()
+    )
+    counts: Counter = Counter()
+    batch: List[PackageData] = []
+    processed_bytes: int = 0
+    started: float = monotonic()
+
+    def flush() -> None:
+        stored: int = storage.store_batch(batch)
+        counts[IMPORTED] += stored
+        counts[SKIPPED] += len(batch) - stored
+        append_checkpoint(checkpoint, [f'{package.package_name}/{package.file_name}' for package in batch])
+        batch.clear()
+        elapsed: float = max(monotonic() - started, 1e-9)
+        done: int = sum(counts.values())
+        print(
+            f'Processed {done}/{len(pending)} files, {done / elapsed:.1f} files/s, '
+            f'{processed_bytes / elapsed / (1 << 20):.1f} MiB/s'
+        )
+
+    with ProcessPoolExecutor(
+            max_workers=processes, initializer=init_import_worker, initargs=(certificates, storage.verify)
+    ) as executor:
+        remaining: Iterator[Dict[str, str]] = iter(pending)
+        in_flight: Deque[Tuple[Dict[str, str], Future]] = deque(
+            (upload, executor.submit(prepare_upload, upload)) for upload in islice(remaining, 2 * batch_size)
+        )
+        while in_flight:
+            upload, future = in_flight.popleft()
+            following: Optional[Dict[str, str]] = next(remaining, None)
+            if following is not None:
+                in_flight.append((following, executor.submit(prepare_upload, following)))
+            package, reason = future.result()
+            if package is None:
+                counts[REJECTED] += 1
+                print(f'Rejected {get_upload_key(upload)}: {reason}')
+                continue
+            batch.append(package)
+            processed_bytes += len(package.file_content)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    return dict(+counts)
+
+
+def start_import(
+        config: str,
+        encoding: str,
+        paths: List[str],
+        checkpoint: str,
+        batch_size: int,
+        processes: Optional[int]
+) -> None:
+    config: RasierwasserConfig = load_config_from_file(config, encoding)
+    storage: Storage = create_storage_from_config(config.storage)
+    counts: Dict[str, int] = import_files(storage, collect_uploads(paths), Path(checkpoint), batch_size, processes)
+    print(', '.join(f'{counts.get(result, 0)} {result}' for result in (IMPORTED, SKIPPED, REJECTED)))
+    if counts.get(REJECTED):
+        raise SystemExit(1)
@@ -0,0 +1,119 @@
+from typing import Dict, Any, Set, Iterable
+from datetime import datetime
+from pathlib import Path
+from hashlib import sha512
+from json import dump, load
+from os import replace
+from rasierwasser.storage.algebra import Storage, PackageName, FileName
+from rasierwasser.server.templates import render_base_index, render_package_index, base_index_json, package_index_json
+from rasierwasser.configuration.storage import create_storage_from_config
+from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+
+
+EXPORT_STATE_FILE: str = '.rasierwasser_export.json'
+
+
+def load_export_state(target: Path) -> Dict[str, Any]:
+    state_file: Path = target.joinpath(EXPORT_STATE_FILE)
+    if not state_file.exists():
+        return dict(last_export=None, files=dict(), compromised=[])
+    with state_file.open('r', encoding='utf-8') as src:
+        return load(src)
+
+
+def write_atomically(target: Path, content: str) -> None:
+    temporary: Path = target.with_name(f'{target.name}.tmp')
+    temporary.write_text(content, encoding='utf-8')
+    replace(temporary, target)
+
+
+def write_json_atomically(target: Path, content: Any) -> None:
+    temporary: Path = target.with_name(f'{target.name}.tmp')
+    with temporary.open('w', encoding='utf-8') as out:
+        dump(content, out, ensure_ascii=False)
+    replace(temporary, target)
+
+
+def export_file(storage: Storage, package: PackageName, file: FileName, target: Path) -> str:
+    """
+    Streams a single file out of the storage into the export tree and returns the hex encoded SHA512 of its content.
+    """
+    temporary: Path = target.with_name(f'{target.name}.tmp')
+    digest = sha512()
+    with temporary.open('wb') as out:
+        for chunk in storage.stream(package, file):
+            digest.update(chunk)
+            out.write(chunk)
+    replace(temporary, target)
+    return digest.hexdigest()
+
+
+def export_package(
+        storage: Storage,
+        package: PackageName,
+        target: Path,
+        exported: Dict[FileName, str],
+        compromised: Set[str]
+) -> None:
+    package_dir: Path = target.joinpath('packages', package)
+    package_dir.mkdir(parents=True, exist_ok=True)
+    files: Iterable[FileName] = tuple(
+        file.file_name for file in storage.index(package) if file.certificate not in compromised
+    )
+    for file in set(exported).difference(files):
+        package_dir.joinpath(file).unlink(missing_ok=True)
+        del exported[file]
+    for file in files:
+        if file not in exported or not package_dir.joinpath(file).exists():
+            exported[file] = export_file(storage, package, file, package_dir.joinpath(file))
+    write_atomically(package_dir.joinpath('index.html'), render_package_index(package, files))
+    write_json_atomically(
+        package_dir.joinpath('index.json'),
+        package_index_json(package, ((file, dict(sha512=exported[file])) for file in files))
+    )
+
+
+def export_repository(storage: Storage, target: Path, full: bool = False) -> Set[PackageName]:
+    """
+    Writes the simple index as static HTML and PEP 691 JSON pages together with all files into the target
+    directory, laid out as packages/index.{html,json}, packages/<package>/index.{html,json} and
+    packages/<package>/<file>. Unless a full export is requested, only packages with uploads since the
+    last export are rewritten. Quarantine does not show up as an upload, so once another certificate has been
+    compromised, all previously exported packages are rewritten and their quarantined files removed. Returns the
+    names of the exported packages.
+    """
+    target.joinpath('packages').mkdir(parents=True, exist_ok=True)
+    state: Dict[str, Any] = (
+        load_export_state(target) if not full else dict(last_export=None, files=dict(), compromised=[])
+    )
+    export_begin: datetime = datetime.utcnow()
+    compromised: Set[str] = set(
+        certificate.name for certificate in storage.certificates() if certificate.compromised is not None
+    )
+    packages: Set[PackageName] = set(storage.packages())
+    if state['last_export'] is None:
+        changed: Set[PackageName] = packages
+    else:
+        changed = set(
+            activity.package
+            for activity in storage.package_activities(datetime.fromisoformat(state['last_export']), datetime.max)
+        )
+        if not compromised.issubset(state.get('compromised', [])):
+            changed.update(state['files'])
+    for package in sorted(changed):
+        export_package(storage, package, target, state['files'].setdefault(package, dict()), compromised)
+        print(f'Exported {package}')
+
+    write_atomically(target.joinpath('packages', 'index.html'), render_base_index(packages))
+    write_json_atomically(target.joinpath('packages', 'index.json'), base_index_json(packages))
+    state['last_export'] = export_begin.isoformat()
+    state['compromised'] = sorted(compromised)
+    write_json_atomically(target.joinpath(EXPORT_STATE_FILE), state)
+    return changed
+
+
+def start_export(config: str, encoding: str, target: str, full: bool = False) -> None:
+    config: RasierwasserConfig = load_config_from_file(config, encoding)
+    storage: Storage = create_storage_from_config(config.storage)
+    changed: Set[PackageName] = export_repository(storage, Path(target), full)
+    print(f'Exported {len(changed)} changed packages to {target}')
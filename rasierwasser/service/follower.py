@@ -0,0 +1,154 @@
+from typing import Dict, Any, Optional, List
+from time import sleep
+from pathlib import Path
+from base64 import b64decode
+from datetime import datetime
+from requests import Session
+from requests.exceptions import RequestException
+from rasierwasser.storage.algebra import Storage, PackageData, CertificateData, PACKAGE_CHANGE
+from rasierwasser.storage.validation import verify_package_data
+from rasierwasser.configuration.storage import create_storage_from_config
+from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+
+
+DOWNLOAD_CHUNK_SIZE: int = 1 << 20
+
+
+def load_cursor(cursor_file: Path) -> str:
+    return cursor_file.read_text(encoding='utf-8').strip() if cursor_file.exists() else ''
+
+
+def save_cursor(cursor_file: Path, cursor: str) -> None:
+    temporary: Path = cursor_file.with_name(f'{cursor_file.name}.tmp')
+    temporary.write_text(cursor, encoding='utf-8')
+    temporary.replace(cursor_file)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def sync_certificates(storage: Storage, session: Session, upstream: str) -> Dict[str, CertificateData]:
+    with session.get(f'{upstream}/certificates') as response:
+        response.raise_for_status()
+        remote: Dict[str, Dict[str, Any]] = response.json()
+    local: Dict[str, CertificateData] = dict((certificate.name, certificate) for certificate in storage.certificates())
+    for name, certificate in remote.items():
+        disabled: Optional[datetime] = parse_timestamp(certificate['disabled'])
+        compromised: Optional[datetime] = parse_timestamp(certificate['compromised'])
+        if name not in local:
+            storage.add_certificate(CertificateData.from_base64(name, certificate['public_key_base64']))
+            if disabled or compromised:
+                storage.update_certificate(name, disabled, compromised)
+        elif (local[name].disabled, local[name].compromised) != (disabled, compromised):
+            if compromised and local[name].compromised is None:
+                storage.compromise_certificate(name, compromised)
+            storage.update_certificate(name, disabled, compromised)
+    return dict((certificate.name, certificate) for certificate in storage.certificates())
+
+
+def download_file(session: Session, upstream: str, package: str, file: str) -> bytes:
+    content: bytearray = bytearray()
+    with session.get(f'{upstream}/packages/{package}/{file}', stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            content.extend(chunk)
+    return bytes(content)
+
+
+def replicate_file(
+        storage: Storage,
+        session: Session,
+        upstream: str,
+        change: Dict[str, Any],
+        certificates: Dict[str, CertificateData]
+) -> None:
+    if change['signature_base64'] is None:
+        print(f"Skipping {change['package']}/{change['filename']}, it is no longer available upstream.")
+        return
+    if any(record.file_name == change['filename'] for record in storage.index(change['package'])):
+        print(f"Skipping {change['package']}/{change['filename']}, it has already been replicated.")
+        return
+    package: PackageData = PackageData(
+        package_name=change['package'],
+        file_name=change['filename'],
+        file_content=download_file(session, upstream, change['package'], change['filename']),
+        signature=b64decode(change['signature_base64']),
+        certificate=change['certificate'],
+        digest=change['digest']
+    )
+    if not storage.verify:
+        verify_package_data(package, certificates[package.certificate])
+    try:
+        storage.store(package)
+    except FileExistsError:
+        print(f'Skipping {package.package_name}/{package.file_name}, it has already been replicated.')
+
+
+def replicate_changes(
+        storage: Storage,
+        session: Session,
+        upstream: str,
+        cursor: str,
+        cursor_file: Path,
+        batch_size: int = 100
+) -> str:
+    """
+    Pulls all changes after the given cursor from the upstream instance and applies them to the local storage.
+    The cursor is persisted after every applied page, so an interrupted follower resumes where it stopped.
+    Returns the cursor after the last applied change.
+    """
+    certificates: Optional[Dict[str, CertificateData]] = None
+    while True:
+        with session.get(f'{upstream}/changes', params=dict(cursor=cursor, limit=batch_size)) as response:
+            response.raise_for_status()
+            feed: Dict[str, Any] = response.json()
+        changes: List[Dict[str, Any]] = feed['changes']
+        if not changes:
+            return cursor
+        if certificates is None or any(change['kind'] != PACKAGE_CHANGE for change in changes):
+            certificates = sync_certificates(storage, session, upstream)
+        for change in changes:
+            if change['kind'] == PACKAGE_CHANGE:
+                replicate_file(storage, session, upstream, change, certificates)
+        cursor = feed['cursor']
+        save_cursor(cursor_file, cursor)
+        print(f'Replicated {len(changes)} changes, cursor is now {cursor}.')
+
+
+def follow(
+        storage: Storage,
+        upstream: str,
+        cursor_file: Path,
+        interval: float = 30.0,
+        batch_size: int = 100,
+        once: bool = False
+) -> None:
+    upstream = upstream.rstrip('/')
+    cursor: str = load_cursor(cursor_file)
+    with Session() as session:
+        while True:
+            try:
+                cursor = replicate_changes(storage, session, upstream, cursor, cursor_file, batch_size)
+            except RequestException as error:
+                if once:
+                    raise
+                print(f'Could not replicate from {upstream}: {error}')
+                cursor = load_cursor(cursor_file)
+            if once:
+                return
+            sleep(interval)
+
+
+def start_follower(
+        config: str,
+        encoding: str,
+        upstream: str,
+        cursor_file: str,
+        interval: float = 30.0,
+        batch_size: int = 100,
+        once: bool = False
+) -> None:
+    config: RasierwasserConfig = load_config_from_file(config, encoding)
+    storage: Storage = create_storage_from_config(config.storage)
+    follow(storage, upstream, Path(cursor_file), interval, batch_size, once)
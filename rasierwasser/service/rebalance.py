@@ -0,0 +1,20 @@
+from typing import List
+from rasierwasser.storage.algebra import Storage
+from rasierwasser.storage.sharding import rebalance_shards
+from rasierwasser.configuration.storage import ShardedBackend, create_shards_from_config
+from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+
+
+def start_rebalance(config: str, encoding: str, previous_shards: int) -> None:
+    config: RasierwasserConfig = load_config_from_file(config, encoding)
+    if config.storage.backend != 'sharded':
+        raise ValueError(f'Can only rebalance sharded storages, got: {config.storage.backend}')
+    sharded: ShardedBackend = ShardedBackend(**config.storage.parameter)
+    if not 0 < previous_shards <= len(sharded.shards):
+        raise ValueError(f'Previous number of shards has to be between 1 and {len(sharded.shards)}')
+    shards: List[Storage] = create_shards_from_config([shard.dict() for shard in sharded.shards])
+    moved: int = 0
+    for package, position, target, files in rebalance_shards(shards, previous_shards):
+        print(f'Moved {package} from shard {position} to shard {target}')
+        moved += files
+    print(f'Moved {moved} files from {previous_shards} to {len(shards)} shards.')
@@ -6,6 +6,12 @@ from rasierwasser.server import WSGIServer
 from rasierwasser.server import default_server
 from rasierwasser.configuration.storage import create_storage_from_config, Storage
 from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+from rasierwasser.service.follower import start_follower
+from rasierwasser.service.export import start_export
+from rasierwasser.helper.upload import start_upload
+from rasierwasser.service.rebalance import start_rebalance
+from rasierwasser.service.sweep import start_sweep
+from rasierwasser.service.bulk_import import start_import
 
 
 class RasierwasserInstance(BaseModel):
@@ -18,7 +24,7 @@ def create_rasierwasser_instance(config: RasierwasserConfig) -> RasierwasserInst
     storage: Storage = create_storage_from_config(config.storage)
     return RasierwasserInstance(
         storage=storage,
-        application=default_server(storage, config.server.debug, config.auth),
+        application=default_server(storage, config.server.debug, config.auth, config.server),
         config=config
     )
 
@@ -34,7 +40,67 @@ def main():
     parser.add_argument('--config', default='/etc/rasierwasser/rasierwasser.yml', help='Config file location.')
     parser.add_argument('--encoding', default='utf-8', help='Config file encoding.')
     parser.add_argument('--pidfile', default='rasierwasser.pid', help='File to store current pid in.')
+    commands = parser.add_subparsers(dest='command', help='Alternative mode, starts the service if omitted.')
+
+    follow = commands.add_parser('follow', help='Replicate changes of an upstream instance into local storage.')
+    follow.add_argument('upstream', help='Base url of the upstream rasierwasser instance.')
+    follow.add_argument('--cursor-file', default='rasierwasser.cursor', help='File to persist replication cursor in.')
+    follow.add_argument('--interval', type=float, default=30.0, help='Seconds to wait between polls.')
+    follow.add_argument('--batch-size', type=int, default=100, help='Number of changes to fetch per request.')
+    follow.add_argument('--once', action='store_true', help='Replicate pending changes and exit.')
+
+    export = commands.add_parser('export', help='Export the package index and all files as static website.')
+    export.add_argument('target', help='Directory to write the export to.')
+    export.add_argument('--full', action='store_true', help='Rewrite all packages, not only changed ones.')
+
+    upload = commands.add_parser('upload', help='Upload signed wheels to a rasierwasser instance.')
+    upload.add_argument('url', help='Base url of the rasierwasser instance.')
+    upload.add_argument(
+        'paths', nargs='+', help='Signing manifests, wheels with detached signature or directories containing them.'
+    )
+    upload.add_argument('--concurrency', type=int, default=4, help='Maximum number of parallel uploads.')
+    upload.add_argument(
+        '--no-skip-existing', dest='skip_existing', action='store_false',
+        help='Upload without checking which files the server already has.'
+    )
+
+    rebalance = commands.add_parser('rebalance', help='Move files after shards have been added to sharded storage.')
+    rebalance.add_argument(
+        'previous_shards', type=int, help='Number of shards before the new ones were appended to the configuration.'
+    )
+
+    sweep = commands.add_parser('sweep', help='Mark a certificate as compromised and quarantine its files.')
+    sweep.add_argument('certificate', help='Name of the compromised certificate.')
+    sweep.add_argument('--verify', action='store_true', help='Verify the signatures of all remaining files.')
+    sweep.add_argument('--workers', type=int, default=4, help='Number of files to verify in parallel.')
+
+    bulk_import = commands.add_parser('import', help='Import signed wheels directly into the configured storage.')
+    bulk_import.add_argument(
+        'paths', nargs='+', help='Signing manifests, wheels with detached signature or directories containing them.'
+    )
+    bulk_import.add_argument(
+        '--checkpoint', default='rasierwasser_import.json', help='File to record imported files in for resuming.'
+    )
+    bulk_import.add_argument('--batch-size', type=int, default=100, help='Number of files stored per transaction.')
+    bulk_import.add_argument('--processes', type=int, default=None, help='Number of processes to verify wheels.')
+
     args = parser.parse_args()
-    with open(args.pidfile, 'w') as out:
-        out.write(str(getpid()))
-    start_service(args.config, args.encoding)
+    if args.command in (None, 'follow'):
+        with open(args.pidfile, 'w') as out:
+            out.write(str(getpid()))
+    if args.command == 'follow':
+        start_follower(
+            args.config, args.encoding, args.upstream, args.cursor_file, args.interval, args.batch_size, args.once
+        )
+    elif args.command == 'export':
+        start_export(args.config, args.encoding, args.target, args.full)
+    elif args.command == 'upload':
+        start_upload(args.url, args.paths, args.concurrency, args.skip_existing)
+    elif args.command == 'rebalance':
+        start_rebalance(args.config, args.encoding, args.previous_shards)
+    elif args.command == 'sweep':
+        start_sweep(args.config, args.encoding, args.certificate, args.verify, args.workers)
+    elif args.command == 'import':
+        start_import(args.config, args.encoding, args.paths, args.checkpoint, args.batch_size, args.processes)
+    else:
+        start_service(args.config, args.encoding)
@@ -0,0 +1,69 @@
+from typing import Dict, List, Tuple, Optional
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from rasierwasser.storage.algebra import Storage, CertificateData, PackageData, PackageName, FileName
+from rasierwasser.storage.validation import verify_package_data
+from rasierwasser.configuration.storage import create_storage_from_config
+from rasierwasser.configuration.main import RasierwasserConfig, load_config_from_file
+
+
+PROGRESS_INTERVAL: int = 100
+
+
+def verify_file(
+        storage: Storage,
+        certificates: Dict[str, CertificateData],
+        package: PackageName,
+        file: FileName
+) -> Optional[str]:
+    """
+    Returns why the file failed verification or None if its signature is valid.
+    """
+    try:
+        data: PackageData = storage.retrieve(package, file)
+        certificate: Optional[CertificateData] = certificates.get(data.certificate)
+        if certificate is None:
+            return f'Unknown certificate {data.certificate}'
+        verify_package_data(data, certificate)
+    except (ValueError, FileNotFoundError) as error:
+        return str(error)
+    return None
+
+
+def verify_files(storage: Storage, workers: int) -> List[Tuple[PackageName, FileName, str]]:
+    """
+    Verifies the signatures of all visible files in parallel and returns the files which failed with the reason.
+    Reading, unpacking and hashing release the GIL, so threads are sufficient and the storage can be shared.
+    """
+    certificates: Dict[str, CertificateData] = dict(
+        (certificate.name, certificate) for certificate in storage.certificates()
+    )
+    files: List[Tuple[PackageName, FileName]] = [
+        (package, record.file_name) for package in sorted(storage.packages()) for record in storage.index(package)
+    ]
+    failed: List[Tuple[PackageName, FileName, str]] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rasierwasser-sweep') as executor:
+        futures: Dict[Future, Tuple[PackageName, FileName]] = dict(
+            (executor.submit(verify_file, storage, certificates, package, file), (package, file))
+            for package, file in files
+        )
+        for done, future in enumerate(as_completed(futures), 1):
+            reason: Optional[str] = future.result()
+            if reason is not None:
+                failed.append((*futures[future], reason))
+            if done % PROGRESS_INTERVAL == 0 or done == len(files):
+                print(f'Verified {done}/{len(files)} files, {len(failed)} failed')
+    return failed
+
+
+def start_sweep(config: str, encoding: str, certificate: str, verify: bool, workers: int) -> None:
+    config: RasierwasserConfig = load_config_from_file(config, encoding)
+    storage: Storage = create_storage_from_config(config.storage)
+    quarantined: int = storage.compromise_certificate(certificate, datetime.utcnow())
+    print(f'Marked {certificate} as compromised and quarantined {quarantined} files.')
+    if verify:
+        failed: List[Tuple[PackageName, FileName, str]] = verify_files(storage, workers)
+        for package, file, reason in failed:
+            print(f'Verification failed for {package}/{file}: {reason}')
+        if failed:
+            raise SystemExit(1)
@@ -1,4 +1,4 @@
-from typing import Callable, Iterable, Dict, Optional
+from typing import Callable, Iterable, Dict, Optional, List, Any, NamedTuple, Sequence, Tuple
 from datetime import datetime
 from hashlib import sha512
 from base64 import b64decode, b64encode
@@ -43,9 +43,12 @@ class PackageData(BaseModel):
     certificate: str
     digest: str = 'sha512'
     upload_time: datetime = Field(default_factory=datetime.now)
+    content_sha512: Optional[str] = Field(default=None)
+
+    def content_hexdigest(self) -> str:
+        return self.content_sha512 if self.content_sha512 else sha512(self.file_content).hexdigest()
 
     def canonical(self) -> Dict[str, str]:
-        print(self)
         return dict(
             package=self.package_name,
             filename=self.file_name,
@@ -74,7 +77,41 @@ class PackageData(BaseModel):
         )
 
 
-class PackageActivity(BaseModel):
+class PackageRecord(NamedTuple):
+    """
+    Metadata of a stored file without its content, as returned by package indexes. The content digest is computed
+    when the file is stored, the content itself is only read when the file is retrieved or streamed.
+    """
+    package_name: PackageName
+    file_name: FileName
+    content_sha512: str
+    signature: bytes
+    certificate: str
+    digest: str
+    upload_time: datetime
+
+    def canonical(self) -> Dict[str, str]:
+        return dict(
+            package=self.package_name,
+            filename=self.file_name,
+            content_sha512=self.content_sha512,
+            signature_base64=b64encode(self.signature).decode(errors='replace'),
+            signature_sha512=sha512(self.signature).hexdigest(),
+            certificate=self.certificate,
+            digest=self.digest,
+            upload_time=self.upload_time.isoformat()
+        )
+
+    @classmethod
+    def from_package_data(cls, package: PackageData, content_sha512: Optional[str] = None) -> 'PackageRecord':
+        return PackageRecord(
+            package.package_name, package.file_name,
+            content_sha512 if content_sha512 else sha512(package.file_content).hexdigest(), package.signature,
+            package.certificate, package.digest, package.upload_time
+        )
+
+
+class PackageActivity(NamedTuple):
     package: PackageName
     file: FileName
     upload_time: datetime
@@ -82,28 +119,102 @@ class PackageActivity(BaseModel):
 
     @classmethod
     def from_package_data(cls, package: PackageData) -> 'PackageActivity':
-        return PackageActivity(
-            package=package.package_name, file=package.file_name,
-            upload_time=package.upload_time, certificate=package.certificate
+        return PackageActivity(package.package_name, package.file_name, package.upload_time, package.certificate)
+
+
+class StoredFile(NamedTuple):
+    """
+    A file together with its quarantine state, as it is moved between storages. Moving keeps the upload time and
+    the quarantine state of the file.
+    """
+    package: PackageData
+    quarantined: Optional[datetime]
+
+
+class DownloadCount(NamedTuple):
+    package: PackageName
+    file: FileName
+    hour: datetime
+    downloads: int
+
+
+PACKAGE_CHANGE: str = 'package'
+CERTIFICATE_CHANGE: str = 'certificate'
+CERTIFICATE_STATE_CHANGE: str = 'certificate_state'
+
+
+class ChangeData(BaseModel):
+    sequence: int
+    kind: str
+    package: Optional[PackageName] = None
+    file: Optional[FileName] = None
+    certificate: Optional[str] = None
+    signature: Optional[bytes] = None
+    digest: Optional[str] = None
+    change_time: datetime
+
+    def canonical(self) -> Dict[str, Any]:
+        return dict(
+            sequence=self.sequence,
+            kind=self.kind,
+            package=self.package,
+            filename=self.file,
+            certificate=self.certificate,
+            signature_base64=b64encode(self.signature).decode('ascii') if self.signature is not None else None,
+            digest=self.digest,
+            change_time=self.change_time.isoformat()
         )
 
 
+class ChangeFeed(BaseModel):
+    """
+    A page of the change log. The cursor is opaque to clients and has to be passed back unchanged to continue
+    after the last change of this page.
+    """
+    changes: List[ChangeData]
+    cursor: str
+
+
 StorePackage = Callable[[PackageData], None]
+StorePackages = Callable[[Sequence[PackageData]], int]
 RetrievePackage = Callable[[PackageName, FileName], PackageData]
-GetPackageIndex = Callable[[PackageName], Iterable[PackageData]]
+StreamPackage = Callable[[PackageName, FileName], Iterable[bytes]]
+RemovePackage = Callable[[PackageName, FileName], None]
+GetStoredFiles = Callable[[], Iterable[Tuple[PackageName, FileName]]]
+ReadStoredFile = Callable[[PackageName, FileName], StoredFile]
+WriteStoredFile = Callable[[StoredFile], None]
+GetPackageIndex = Callable[[PackageName], Iterable[PackageRecord]]
 GetPackages = Callable[[], Iterable[str]]
 GetPackageActivities = Callable[[datetime, datetime], Iterable[PackageActivity]]
 GetCertificates = Callable[[], Iterable[CertificateData]]
 StoreCertificate = Callable[[CertificateData], None]
+UpdateCertificate = Callable[[str, Optional[datetime], Optional[datetime]], None]
+CompromiseCertificate = Callable[[str, datetime], int]
+GetChanges = Callable[[str, int], ChangeFeed]
+GetStatistics = Callable[[], Dict[str, Any]]
+RecordDownloads = Callable[[Sequence[DownloadCount]], None]
+GetDownloadStatistics = Callable[[datetime, datetime, Optional[PackageName]], Iterable[DownloadCount]]
 
 
 class Storage(BaseModel):
     store: StorePackage
+    store_batch: StorePackages
     retrieve: RetrievePackage
     index: GetPackageIndex
     packages: GetPackages
     add_certificate: StoreCertificate
     certificates: GetCertificates
     package_activities: GetPackageActivities
+    update_certificate: UpdateCertificate
+    changes: GetChanges
+    stream: StreamPackage
+    remove: RemovePackage
+    stored_files: GetStoredFiles
+    read_stored_file: ReadStoredFile
+    write_stored_file: WriteStoredFile
+    compromise_certificate: CompromiseCertificate
+    record_downloads: RecordDownloads
+    download_statistics: GetDownloadStatistics
+    statistics: Optional[GetStatistics] = None
     hash_algorithm: str = 'sha512'
     verify: bool = True
@@ -0,0 +1,184 @@
+from typing import Dict, Tuple, Optional, Iterable, Any, Set
+from datetime import datetime
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+from time import monotonic
+from rasierwasser.storage.algebra import (
+    Storage, PackageData, PackageName, FileName, RetrievePackage, StreamPackage, RemovePackage, CompromiseCertificate,
+    GetCertificates
+)
+
+
+CacheKey = Tuple[PackageName, FileName]
+
+COMPROMISED_REFRESH_INTERVAL: float = 5.0
+
+
+class FileCache:
+    """
+    Least recently used cache of retrieved files, bounded by the total size of the cached file contents. Files are
+    immutable once stored, so entries never become stale and only have to be discarded when files are removed or
+    quarantined.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes: int = max_bytes
+        self._entries: 'OrderedDict[CacheKey, PackageData]' = OrderedDict()
+        self._resident_bytes: int = 0
+        self._hits: int = 0
+        self._misses: int = 0
+        self._lock: Lock = Lock()
+
+    def get(self, key: CacheKey) -> Optional[PackageData]:
+        with self._lock:
+            data: Optional[PackageData] = self._entries.get(key)
+            if data is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: CacheKey, data: PackageData) -> None:
+        size: int = len(data.file_content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self._resident_bytes += size
+            while self._resident_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._resident_bytes -= len(evicted.file_content)
+
+    def discard(self, key: CacheKey) -> None:
+        with self._lock:
+            data: Optional[PackageData] = self._entries.pop(key, None)
+            if data is not None:
+                self._resident_bytes -= len(data.file_content)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._resident_bytes = 0
+
+    def statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            requests: int = self._hits + self._misses
+            return dict(
+                hits=self._hits,
+                misses=self._misses,
+                hit_ratio=self._hits / requests if requests else 0.0,
+                entries=len(self._entries),
+                resident_bytes=self._resident_bytes,
+                max_bytes=self.max_bytes
+            )
+
+
+class CompromisedCertificates:
+    """
+    Names of the compromised certificates as seen by this process. Certificates are also compromised by other
+    processes like a sweep or a follower, which can not clear the cache of a server, so the names are reloaded
+    from the storage at most every refresh_interval seconds instead of on every cache hit.
+    """
+
+    def __init__(self, certificates: GetCertificates, refresh_interval: float) -> None:
+        self._certificates: GetCertificates = certificates
+        self._refresh_interval: float = refresh_interval
+        self._names: Set[str] = set()
+        self._expires: float = 0.0
+        self._lock: Lock = Lock()
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            if monotonic() >= self._expires:
+                self._names = set(
+                    certificate.name for certificate in self._certificates() if certificate.compromised is not None
+                )
+                self._expires = monotonic() + self._refresh_interval
+            return name in self._names
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires = 0.0
+
+
+def cached_get(cache: FileCache, compromised: CompromisedCertificates, key: CacheKey) -> Optional[PackageData]:
+    """
+    Returns a cached file unless its certificate has been compromised, then the wrapped storage decides whether
+    the file is still visible.
+    """
+    data: Optional[PackageData] = cache.get(key)
+    if data is not None and data.certificate in compromised:
+        cache.discard(key)
+        return None
+    return data
+
+
+def cached_retrieve(
+        cache: FileCache,
+        compromised: CompromisedCertificates,
+        retrieve: RetrievePackage,
+        package: PackageName,
+        file: FileName
+) -> PackageData:
+    data: Optional[PackageData] = cached_get(cache, compromised, (package, file))
+    if data is None:
+        data = retrieve(package, file)
+        cache.put((package, file), data)
+    return data
+
+
+def cached_stream(
+        cache: FileCache,
+        compromised: CompromisedCertificates,
+        stream: StreamPackage,
+        package: PackageName,
+        file: FileName
+) -> Iterable[bytes]:
+    """
+    Serves cached files from memory, but streams all other files from the wrapped storage without admitting them,
+    so bulk reads like exports do not evict the hot files.
+    """
+    data: Optional[PackageData] = cached_get(cache, compromised, (package, file))
+    return (data.file_content, ) if data is not None else stream(package, file)
+
+
+def cached_remove(cache: FileCache, remove: RemovePackage, package: PackageName, file: FileName) -> None:
+    remove(package, file)
+    cache.discard((package, file))
+
+
+def cached_compromise_certificate(
+        cache: FileCache,
+        compromised_certificates: CompromisedCertificates,
+        compromise_certificate: CompromiseCertificate,
+        name: str,
+        compromised: datetime
+) -> int:
+    quarantined: int = compromise_certificate(name, compromised)
+    compromised_certificates.invalidate()
+    cache.clear()
+    return quarantined
+
+
+def create_cached_storage(
+        storage: Storage,
+        max_bytes: int,
+        refresh_interval: float = COMPROMISED_REFRESH_INTERVAL
+) -> Storage:
+    cache: FileCache = FileCache(max_bytes)
+    compromised: CompromisedCertificates = CompromisedCertificates(storage.certificates, refresh_interval)
+    return storage.copy(
+        update=dict(
+            retrieve=partial(cached_retrieve, cache, compromised, storage.retrieve),
+            stream=partial(cached_stream, cache, compromised, storage.stream),
+            remove=partial(cached_remove, cache, storage.remove),
+            compromise_certificate=partial(
+                cached_compromise_certificate, cache, compromised, storage.compromise_certificate
+            ),
+            statistics=cache.statistics
+        )
+    )
@@ -0,0 +1,74 @@
+from typing import Dict, Callable, Hashable, Optional, TypeVar, Generic, Iterable
+from functools import partial
+from threading import Lock, Event
+from rasierwasser.storage.algebra import (
+    Storage, PackageData, PackageRecord, PackageName, FileName, RetrievePackage, GetPackageIndex
+)
+
+
+Result = TypeVar('Result')
+
+
+class _Flight(Generic[Result]):
+    def __init__(self) -> None:
+        self.done: Event = Event()
+        self.result: Optional[Result] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[Result]):
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, all callers arriving while
+    it is in flight wait for it and receive the same result or exception.
+    """
+
+    def __init__(self) -> None:
+        self._lock: Lock = Lock()
+        self._flights: Dict[Hashable, _Flight[Result]] = dict()
+
+    def do(self, key: Hashable, function: Callable[[], Result]) -> Result:
+        with self._lock:
+            flight: Optional[_Flight[Result]] = self._flights.get(key)
+            leader: bool = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+def coalesced_index(flight: SingleFlight, index: GetPackageIndex, package: PackageName) -> Iterable[PackageRecord]:
+    return flight.do(('index', package), lambda: tuple(index(package)))
+
+
+def coalesced_retrieve(
+        flight: SingleFlight,
+        retrieve: RetrievePackage,
+        package: PackageName,
+        file: FileName
+) -> PackageData:
+    return flight.do(('retrieve', package, file), partial(retrieve, package, file))
+
+
+def create_coalescing_storage(storage: Storage) -> Storage:
+    flight: SingleFlight = SingleFlight()
+    return storage.copy(
+        update=dict(
+            index=partial(coalesced_index, flight, storage.index),
+            retrieve=partial(coalesced_retrieve, flight, storage.retrieve)
+        )
+    )
@@ -1,15 +1,31 @@
-from typing import Optional, Iterable, Dict, Any
+from typing import Optional, Iterable, Iterator, Dict, Any, List, Tuple, Set, Sequence
 from datetime import datetime
 from functools import partial
-from sqlalchemy import create_engine, and_
-from sqlalchemy.exc import NoResultFound
+from hashlib import sha512
+from sqlite3 import Connection as SQLiteConnection
+from sqlalchemy import create_engine, and_, func, inspect, literal_column, text, tuple_
+from sqlalchemy.exc import NoResultFound, IntegrityError
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import Engine
-from rasierwasser.storage.algebra import Storage, PackageData, FileName, PackageName, CertificateData, PackageActivity
-from rasierwasser.storage.database.model import Certificate, PackageFile, Base
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from rasierwasser.storage.algebra import (
+    Storage, PackageData, PackageRecord, FileName, PackageName, CertificateData, PackageActivity, ChangeFeed,
+    DownloadCount, StoredFile,
+    PACKAGE_CHANGE, CERTIFICATE_CHANGE, CERTIFICATE_STATE_CHANGE
+)
+from rasierwasser.storage.database.model import Certificate, PackageFile, ChangeLogEntry, DownloadStatistic, Base
 from rasierwasser.storage.validation import verify_package_data
 
 
+STREAM_CHUNK_SIZE: int = 1 << 20
+QUARANTINE_BATCH_SIZE: int = 500
+MIGRATION_BATCH_SIZE: int = 100
+
+VISIBLE = PackageFile.quarantined.is_(None)
+UPSERT_INSERTS = dict(sqlite=sqlite_insert, postgresql=postgresql_insert)
+
+
 class SessionGuard:
     def __init__(self, create_session: sessionmaker) -> None:
         self._session: Session = create_session()
@@ -23,13 +39,16 @@ class SessionGuard:
         self._session.close()
 
 
-def index(create_session: sessionmaker, package: PackageName) -> Iterable[PackageData]:
+def index(create_session: sessionmaker, package: PackageName) -> Iterable[PackageRecord]:
     with SessionGuard(create_session) as session:
         return tuple(
-            map(
-                PackageFile.as_package_data,
-                session.query(PackageFile).filter(PackageFile.package == package)
+            PackageRecord(
+                package, file, content_sha512, signature, certificate, digest if digest else 'sha512', upload_time
             )
+            for package, file, content_sha512, signature, certificate, digest, upload_time in session.query(
+                PackageFile.package, PackageFile.file, PackageFile.content_sha512, PackageFile.signature,
+                PackageFile.certificate, PackageFile.digest, PackageFile.upload_time
+            ).filter(PackageFile.package == package).filter(VISIBLE)
         )
 
 
@@ -38,20 +57,79 @@ def retrieve(create_session: sessionmaker, package: PackageName, file: FileName)
         try:
             data: PackageFile = session.query(
                 PackageFile
-            ).filter(PackageFile.package == package).filter(PackageFile.file == file).one()
+            ).filter(PackageFile.package == package).filter(PackageFile.file == file).filter(VISIBLE).one()
         except NoResultFound:
             raise FileNotFoundError(f'{package}/{file}')
         else:
             return data.as_package_data()
 
 
+def read_blob(create_session: sessionmaker, package: PackageName, file: FileName) -> Iterator[bytes]:
+    with SessionGuard(create_session) as session:
+        rowid: Optional[int] = session.query(
+            literal_column('rowid')
+        ).select_from(PackageFile).filter(
+            PackageFile.package == package
+        ).filter(PackageFile.file == file).filter(VISIBLE).scalar()
+        if rowid is None:
+            raise FileNotFoundError(f'{package}/{file}')
+        connection = session.connection().connection.connection
+        with connection.blobopen(PackageFile.__tablename__, 'content', rowid, readonly=True) as blob:
+            for chunk in iter(partial(blob.read, STREAM_CHUNK_SIZE), b''):
+                yield chunk
+
+
+def stream(create_session: sessionmaker, package: PackageName, file: FileName) -> Iterable[bytes]:
+    """
+    Reads the content of a file in chunks of STREAM_CHUNK_SIZE bytes. On SQLite the chunks are read with incremental
+    BLOB I/O, so the content is never held in memory at once. Other databases and Python versions without
+    sqlite3.Connection.blobopen read the whole content with a single query instead.
+    """
+    with SessionGuard(create_session) as session:
+        incremental: bool = session.bind.dialect.name == 'sqlite' and hasattr(SQLiteConnection, 'blobopen')
+        found: int = session.query(
+            PackageFile.file
+        ).filter(PackageFile.package == package).filter(PackageFile.file == file).filter(VISIBLE).count()
+    if found == 0:
+        raise FileNotFoundError(f'{package}/{file}')
+    if not incremental:
+        return (retrieve(create_session, package, file).file_content, )
+    return read_blob(create_session, package, file)
+
+
 def get_certificate(create_session: sessionmaker, name: str) -> CertificateData:
     with SessionGuard(create_session) as session:
         try:
             certificate: Certificate = session.query(Certificate).filter(Certificate.name == name).one()
             return certificate.as_certificate_data()
         except NoResultFound:
-            raise FileNotFoundError(f'Found no certificate with name: {certificate}')
+            raise FileNotFoundError(f'Found no certificate with name: {name}')
+
+
+def log_change(session: Session, entry: ChangeLogEntry) -> None:
+    """
+    Adds an entry to the change log. Sequence numbers are assigned on insert and not on commit, so on PostgreSQL
+    the log is locked against other writers until the transaction ends. Otherwise a transaction could commit a
+    lower sequence after a follower has already read a higher one and the follower would skip it. SQLite
+    serialises all writers by itself. Readers of the log are not blocked.
+    """
+    if session.bind.dialect.name == 'postgresql':
+        session.execute(text(f'LOCK TABLE {ChangeLogEntry.__tablename__} IN EXCLUSIVE MODE'))
+    session.add(entry)
+
+
+def create_package_file(package: PackageData) -> PackageFile:
+    return PackageFile(
+        package=package.package_name, file=package.file_name, content=package.file_content,
+        content_sha512=package.content_hexdigest(), signature=package.signature, certificate=package.certificate,
+        digest=package.digest
+    )
+
+
+def create_package_change(package: PackageData) -> ChangeLogEntry:
+    return ChangeLogEntry(
+        kind=PACKAGE_CHANGE, package=package.package_name, file=package.file_name, certificate=package.certificate
+    )
 
 
 def store(create_session: sessionmaker, verify: bool, package: PackageData) -> None:
@@ -59,19 +137,108 @@ def store(create_session: sessionmaker, verify: bool, package: PackageData) -> N
         verify_package_data(package, get_certificate(create_session, package.certificate))
 
     with SessionGuard(create_session) as session:
-        data: PackageFile = PackageFile(
-            package=package.package_name, file=package.file_name, content=package.file_content,
-            signature=package.signature, certificate=package.certificate
+        session.add(create_package_file(package))
+        log_change(session, create_package_change(package))
+        try:
+            session.commit()
+        except IntegrityError:
+            raise FileExistsError(f'{package.package_name}/{package.file_name}')
+
+
+def store_batch(create_session: sessionmaker, packages: Sequence[PackageData]) -> int:
+    """
+    Stores packages in a single transaction without verifying them, they have to be verified by the caller. Files
+    which already exist are skipped. If another writer stores one of the files between the check and the commit,
+    the batch is stored file by file instead and the colliding files are skipped. Returns the number of stored files.
+    """
+    with SessionGuard(create_session) as session:
+        existing: Set[Tuple[PackageName, FileName]] = set(
+            tuple(key) for key in session.query(PackageFile.package, PackageFile.file).filter(
+                tuple_(PackageFile.package, PackageFile.file).in_(
+                    [(package.package_name, package.file_name) for package in packages]
+                )
+            )
         )
-        session.add(data)
+        stored: int = 0
+        for package in packages:
+            if (package.package_name, package.file_name) in existing:
+                continue
+            existing.add((package.package_name, package.file_name))
+            session.add(create_package_file(package))
+            log_change(session, create_package_change(package))
+            stored += 1
+        try:
+            session.commit()
+            return stored
+        except IntegrityError:
+            session.rollback()
+    stored = 0
+    for package in packages:
+        try:
+            store(create_session, False, package)
+            stored += 1
+        except FileExistsError:
+            pass
+    return stored
+
+
+def stored_files(create_session: sessionmaker) -> Iterable[Tuple[PackageName, FileName]]:
+    """
+    Lists all stored files including quarantined ones, it is meant for moving files between storages.
+    """
+    with SessionGuard(create_session) as session:
+        return tuple(tuple(key) for key in session.query(PackageFile.package, PackageFile.file))
+
+
+def read_stored_file(create_session: sessionmaker, package: PackageName, file: FileName) -> StoredFile:
+    with SessionGuard(create_session) as session:
+        try:
+            data: PackageFile = session.query(
+                PackageFile
+            ).filter(PackageFile.package == package).filter(PackageFile.file == file).one()
+        except NoResultFound:
+            raise FileNotFoundError(f'{package}/{file}')
+        return StoredFile(data.as_package_data(), data.quarantined)
+
+
+def write_stored_file(create_session: sessionmaker, stored: StoredFile) -> None:
+    """
+    Stores a file moved from another storage with its upload time and quarantine state, without verifying it.
+    Visible files are recorded in the change log at their upload time, so followers of a fresh cursor find them.
+    """
+    package_file: PackageFile = create_package_file(stored.package)
+    package_file.upload_time = stored.package.upload_time
+    package_file.quarantined = stored.quarantined
+    with SessionGuard(create_session) as session:
+        session.add(package_file)
+        if stored.quarantined is None:
+            change: ChangeLogEntry = create_package_change(stored.package)
+            change.change_time = stored.package.upload_time
+            log_change(session, change)
+        try:
+            session.commit()
+        except IntegrityError:
+            raise FileExistsError(f'{stored.package.package_name}/{stored.package.file_name}')
+
+
+def remove(create_session: sessionmaker, package: PackageName, file: FileName) -> None:
+    """
+    Deletes a file without recording a change, it is meant for moving files between storages.
+    """
+    with SessionGuard(create_session) as session:
+        deleted: int = session.query(
+            PackageFile
+        ).filter(PackageFile.package == package).filter(PackageFile.file == file).delete()
         session.commit()
+    if not deleted:
+        raise FileNotFoundError(f'{package}/{file}')
 
 
 def packages(create_session: sessionmaker) -> Iterable[str]:
     with SessionGuard(create_session) as session:
         return set(
-            result.package
-            for result in session.query(PackageFile)
+            package
+            for package, in session.query(PackageFile.package).filter(VISIBLE).distinct()
         )
 
 
@@ -85,21 +252,206 @@ def certificates(create_session: sessionmaker) -> Iterable[CertificateData]:
 def add_certificate(create_session: sessionmaker, certificate: CertificateData) -> None:
     with SessionGuard(create_session) as session:
         session.add(Certificate(name=certificate.name, public_key=certificate.public_key))
+        log_change(session, ChangeLogEntry(kind=CERTIFICATE_CHANGE, certificate=certificate.name))
         session.commit()
 
 
+def update_certificate(
+        create_session: sessionmaker,
+        name: str,
+        disabled: Optional[datetime],
+        compromised: Optional[datetime]
+) -> None:
+    with SessionGuard(create_session) as session:
+        try:
+            certificate: Certificate = session.query(Certificate).filter(Certificate.name == name).one()
+        except NoResultFound:
+            raise FileNotFoundError(f'Found no certificate with name: {name}')
+        certificate.disabled = disabled
+        certificate.compromised = compromised
+        log_change(session, ChangeLogEntry(kind=CERTIFICATE_STATE_CHANGE, certificate=name))
+        session.commit()
+
+
+def compromise_certificate(create_session: sessionmaker, name: str, compromised: datetime) -> int:
+    """
+    Marks a certificate as compromised and quarantines all files signed with it, which hides them from indexes,
+    downloads and the change feed. Files are quarantined in batches of QUARANTINE_BATCH_SIZE, each in its own
+    transaction, so uploads and downloads are not blocked for the whole sweep. Returns the number of quarantined
+    files.
+    """
+    with SessionGuard(create_session) as session:
+        try:
+            certificate: Certificate = session.query(Certificate).filter(Certificate.name == name).one()
+        except NoResultFound:
+            raise FileNotFoundError(f'Found no certificate with name: {name}')
+        certificate.compromised = compromised
+        log_change(session, ChangeLogEntry(kind=CERTIFICATE_STATE_CHANGE, certificate=name))
+        session.commit()
+
+    quarantined: int = 0
+    while True:
+        with SessionGuard(create_session) as session:
+            batch: List[Tuple[PackageName, FileName]] = [
+                tuple(key) for key in session.query(
+                    PackageFile.package, PackageFile.file
+                ).filter(PackageFile.certificate == name).filter(VISIBLE).limit(QUARANTINE_BATCH_SIZE)
+            ]
+            if not batch:
+                return quarantined
+            session.query(PackageFile).filter(tuple_(PackageFile.package, PackageFile.file).in_(batch)).update(
+                {PackageFile.quarantined: compromised}, synchronize_session=False
+            )
+            session.commit()
+        quarantined += len(batch)
+
+
+def changes(create_session: sessionmaker, cursor: str, limit: int) -> ChangeFeed:
+    since: int = int(cursor) if cursor else 0
+    with SessionGuard(create_session) as session:
+        entries = tuple(
+            entry.as_change_data(signature, digest)
+            for entry, signature, digest in session.query(
+                ChangeLogEntry, PackageFile.signature, PackageFile.digest
+            ).outerjoin(
+                PackageFile,
+                and_(PackageFile.package == ChangeLogEntry.package, PackageFile.file == ChangeLogEntry.file, VISIBLE)
+            ).filter(ChangeLogEntry.sequence > since).order_by(ChangeLogEntry.sequence).limit(limit)
+        )
+        return ChangeFeed(changes=entries, cursor=str(entries[-1].sequence if entries else since))
+
+
 def get_package_activities(create_session: sessionmaker, begin: datetime, end: datetime) -> Iterable[PackageActivity]:
     with SessionGuard(create_session) as session:
-        return sorted(
+        return tuple(
             map(
-                lambda r: PackageActivity.from_package_data(PackageFile.as_package_data(r)),
-                session.query(PackageFile).filter(and_(PackageFile.upload_time >= begin, PackageFile.upload_time < end))
-            ),
-            key=lambda a: a.upload_time,
-            reverse=True
+                PackageActivity._make,
+                session.query(
+                    PackageFile.package, PackageFile.file, PackageFile.upload_time, PackageFile.certificate
+                ).filter(
+                    and_(PackageFile.upload_time >= begin, PackageFile.upload_time < end, VISIBLE)
+                ).order_by(PackageFile.upload_time.desc())
+            )
         )
 
 
+def record_downloads(create_session: sessionmaker, counts: Sequence[DownloadCount]) -> None:
+    """
+    Adds download counts in a single transaction. Databases supporting ON CONFLICT get one batched upsert, all
+    others fall back to updating the rows one by one.
+    """
+    if not counts:
+        return
+    with SessionGuard(create_session) as session:
+        insert = UPSERT_INSERTS.get(session.bind.dialect.name)
+        if insert is not None:
+            statement = insert(DownloadStatistic)
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[DownloadStatistic.package, DownloadStatistic.file, DownloadStatistic.hour],
+                    set_=dict(downloads=DownloadStatistic.downloads + statement.excluded.downloads)
+                ),
+                [count._asdict() for count in counts]
+            )
+        else:
+            for count in counts:
+                row: Optional[DownloadStatistic] = session.get(
+                    DownloadStatistic, (count.package, count.file, count.hour)
+                )
+                if row is None:
+                    session.add(DownloadStatistic(**count._asdict()))
+                else:
+                    row.downloads += count.downloads
+        session.commit()
+
+
+def download_statistics(
+        create_session: sessionmaker,
+        begin: datetime,
+        end: datetime,
+        package: Optional[PackageName] = None
+) -> Iterable[DownloadCount]:
+    with SessionGuard(create_session) as session:
+        query = session.query(
+            DownloadStatistic.package, DownloadStatistic.file, DownloadStatistic.hour, DownloadStatistic.downloads
+        ).filter(and_(DownloadStatistic.hour >= begin, DownloadStatistic.hour < end))
+        if package is not None:
+            query = query.filter(DownloadStatistic.package == package)
+        return tuple(
+            map(
+                DownloadCount._make,
+                query.order_by(DownloadStatistic.hour, DownloadStatistic.package, DownloadStatistic.file)
+            )
+        )
+
+
+def backfill_content_digests(create_session: sessionmaker) -> None:
+    """
+    Stores the digest of every file stored before content digests existed. Rows without content have no digest
+    and are left as they are.
+    """
+    while True:
+        with SessionGuard(create_session) as session:
+            batch: List[Tuple[PackageName, FileName, bytes]] = session.query(
+                PackageFile.package, PackageFile.file, PackageFile.content
+            ).filter(PackageFile.content_sha512.is_(None)).filter(
+                PackageFile.content.isnot(None)
+            ).limit(MIGRATION_BATCH_SIZE).all()
+            if not batch:
+                return
+            for package, file, content in batch:
+                session.query(PackageFile).filter(PackageFile.package == package).filter(
+                    PackageFile.file == file
+                ).update({PackageFile.content_sha512: sha512(content).hexdigest()}, synchronize_session=False)
+            session.commit()
+
+
+def seed_change_log(create_session: sessionmaker) -> None:
+    """
+    Records a change for every certificate and file stored before the change log existed, in upload order, so
+    followers of an upgraded instance replicate them as well.
+    """
+    with SessionGuard(create_session) as session:
+        entries: List[ChangeLogEntry] = [
+            ChangeLogEntry(kind=CERTIFICATE_CHANGE, certificate=name, change_time=upload_time)
+            for name, upload_time in session.query(Certificate.name, Certificate.upload_time)
+        ] + [
+            ChangeLogEntry(
+                kind=PACKAGE_CHANGE, package=package, file=file, certificate=certificate, change_time=upload_time
+            )
+            for package, file, certificate, upload_time in session.query(
+                PackageFile.package, PackageFile.file, PackageFile.certificate, PackageFile.upload_time
+            )
+        ]
+        entries.sort(
+            key=lambda entry: (
+                entry.change_time if entry.change_time else datetime.min, entry.kind != CERTIFICATE_CHANGE
+            )
+        )
+        session.add_all(entries)
+        session.commit()
+
+
+def migrate_schema(engine: Engine, existing_tables: Set[str]) -> None:
+    """
+    Adds columns and indexes to databases created by earlier versions, create_all only creates missing tables.
+    Content digests of files stored before they were recorded are computed once, in batches. If the change log
+    has just been created, it is seeded with the existing certificates and files.
+    """
+    columns: Set[str] = set(column['name'] for column in inspect(engine).get_columns(PackageFile.__tablename__))
+    for name in ('quarantined', 'content_sha512'):
+        if name not in columns:
+            column_type: str = PackageFile.__table__.c[name].type.compile(engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {PackageFile.__tablename__} ADD COLUMN {name} {column_type}'))
+    for table_index in PackageFile.__table__.indexes:
+        table_index.create(engine, checkfirst=True)
+    if 'content_sha512' not in columns:
+        backfill_content_digests(sessionmaker(engine))
+    if ChangeLogEntry.__tablename__ not in existing_tables:
+        seed_change_log(sessionmaker(engine))
+
+
 def create_database_storage(db_url: str, verify: bool = True, options: Optional[Dict[str, Any]] = None) -> Storage:
     """
     Args:
@@ -111,17 +463,30 @@ def create_database_storage(db_url: str, verify: bool = True, options: Optional[
     >>> create_database_storage('sqlite:///test.sqlite')
     """
     engine: Engine = create_engine(db_url, **(options if options else dict()))
+    existing_tables: Set[str] = set(inspect(engine).get_table_names())
     Base.metadata.create_all(engine, checkfirst=True)
+    migrate_schema(engine, existing_tables)
     create_session: sessionmaker = sessionmaker(engine)
 
     return Storage(
         store=partial(store, create_session, verify),
+        store_batch=partial(store_batch, create_session),
         retrieve=partial(retrieve, create_session),
         index=partial(index, create_session),
         packages=partial(packages, create_session),
         add_certificate=partial(add_certificate, create_session),
         certificates=partial(certificates, create_session),
         verify=verify,
-        package_activities=partial(get_package_activities, create_session)
+        package_activities=partial(get_package_activities, create_session),
+        update_certificate=partial(update_certificate, create_session),
+        changes=partial(changes, create_session),
+        stream=partial(stream, create_session),
+        remove=partial(remove, create_session),
+        stored_files=partial(stored_files, create_session),
+        read_stored_file=partial(read_stored_file, create_session),
+        write_stored_file=partial(write_stored_file, create_session),
+        compromise_certificate=partial(compromise_certificate, create_session),
+        record_downloads=partial(record_downloads, create_session),
+        download_statistics=partial(download_statistics, create_session)
     )
 
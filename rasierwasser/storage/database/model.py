@@ -1,7 +1,8 @@
-from sqlalchemy import Column, BLOB, TEXT, ForeignKey, DATETIME
+from typing import Optional
+from sqlalchemy import Column, BLOB, TEXT, ForeignKey, DATETIME, INTEGER
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
-from rasierwasser.storage.algebra import PackageData, CertificateData
+from rasierwasser.storage.algebra import PackageData, CertificateData, ChangeData
 
 Base = declarative_base()
 
@@ -31,19 +32,53 @@ class PackageFile(Base):
     package = Column(TEXT, primary_key=True)
     file = Column(TEXT, primary_key=True)
     content = Column(BLOB)
+    content_sha512 = Column(TEXT, nullable=True)
     signature = Column(BLOB)
-    certificate = Column(TEXT, ForeignKey('certificates.name'))
+    certificate = Column(TEXT, ForeignKey('certificates.name'), index=True)
     digest = Column(TEXT)
     upload_time = Column(DATETIME, default=datetime.utcnow)
+    quarantined = Column(DATETIME, default=None, nullable=True)
 
     def as_package_data(self) -> PackageData:
-        return PackageData(
+        return PackageData.construct(
             package_name=self.package,
             file_name=self.file,
             file_content=self.content,
             signature=self.signature,
             certificate=self.certificate,
+            digest=self.digest if self.digest else 'sha512',
             upload_time=self.upload_time
         )
 
 
+class ChangeLogEntry(Base):
+    __tablename__ = 'changes'
+    __table_args__ = dict(sqlite_autoincrement=True)
+
+    sequence = Column(INTEGER, primary_key=True, autoincrement=True)
+    kind = Column(TEXT, nullable=False)
+    package = Column(TEXT, nullable=True)
+    file = Column(TEXT, nullable=True)
+    certificate = Column(TEXT, nullable=True)
+    change_time = Column(DATETIME, default=datetime.utcnow)
+
+    def as_change_data(self, signature: Optional[bytes] = None, digest: Optional[str] = None) -> ChangeData:
+        return ChangeData(
+            sequence=self.sequence,
+            kind=self.kind,
+            package=self.package,
+            file=self.file,
+            certificate=self.certificate,
+            signature=signature,
+            digest=digest,
+            change_time=self.change_time
+        )
+
+
+class DownloadStatistic(Base):
+    __tablename__ = 'downloads'
+
+    package = Column(TEXT, primary_key=True)
+    file = Column(TEXT, primary_key=True)
+    hour = Column(DATETIME, primary_key=True, index=True)
+    downloads = Column(INTEGER, nullable=False, default=0)
@@ -0,0 +1,302 @@
+from typing import Optional, Iterable, Dict, List, Tuple, Any, Sequence
+from datetime import datetime
+from functools import partial
+from threading import RLock
+from bisect import bisect_left, insort
+from pathlib import Path
+from pickle import dump, load, HIGHEST_PROTOCOL
+from os import replace
+from atexit import register
+from rasierwasser.storage.algebra import (
+    Storage, PackageData, PackageRecord, FileName, PackageName, CertificateData, PackageActivity, ChangeData,
+    ChangeFeed, DownloadCount, StoredFile,
+    PACKAGE_CHANGE, CERTIFICATE_CHANGE, CERTIFICATE_STATE_CHANGE
+)
+from rasierwasser.storage.validation import verify_package_data
+
+
+class MemoryState:
+    """
+    Holds all data of a memory storage together with the indexes used for lookups. Quarantined files are moved out
+    of files into quarantine. Every access has to hold the lock of the state.
+    """
+
+    def __init__(self) -> None:
+        self.lock: RLock = RLock()
+        self.files: Dict[PackageName, Dict[FileName, PackageData]] = dict()
+        self.quarantine: Dict[PackageName, Dict[FileName, PackageData]] = dict()
+        self.digests: Dict[Tuple[PackageName, FileName], str] = dict()
+        self.uploads: List[Tuple[datetime, PackageName, FileName]] = []
+        self.certificates: Dict[str, CertificateData] = dict()
+        self.changes: List[ChangeData] = []
+        self.downloads: Dict[Tuple[PackageName, FileName, datetime], int] = dict()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return dict(
+            files=self.files, quarantine=self.quarantine, digests=self.digests, uploads=self.uploads,
+            certificates=self.certificates, changes=self.changes, downloads=self.downloads
+        )
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__()
+        self.__dict__.update(state)
+
+    def log_change(self, kind: str, change_time: Optional[datetime] = None, **fields: Any) -> None:
+        self.changes.append(
+            ChangeData(
+                sequence=len(self.changes) + 1, kind=kind,
+                change_time=change_time if change_time else datetime.utcnow(), **fields
+            )
+        )
+
+
+def load_snapshot(snapshot: Path) -> MemoryState:
+    with snapshot.open('rb') as src:
+        return load(src)
+
+
+def save_snapshot(state: MemoryState, snapshot: Path) -> None:
+    temporary: Path = snapshot.with_name(f'{snapshot.name}.tmp')
+    with state.lock:
+        with temporary.open('wb') as out:
+            dump(state, out, protocol=HIGHEST_PROTOCOL)
+    replace(temporary, snapshot)
+
+
+def index(state: MemoryState, package: PackageName) -> Iterable[PackageRecord]:
+    with state.lock:
+        return tuple(
+            PackageRecord.from_package_data(data, state.digests.get((package, file)))
+            for file, data in state.files.get(package, dict()).items()
+        )
+
+
+def retrieve(state: MemoryState, package: PackageName, file: FileName) -> PackageData:
+    with state.lock:
+        try:
+            return state.files[package][file]
+        except KeyError:
+            raise FileNotFoundError(f'{package}/{file}')
+
+
+def stream(state: MemoryState, package: PackageName, file: FileName) -> Iterable[bytes]:
+    return (retrieve(state, package, file).file_content, )
+
+
+def get_certificate(state: MemoryState, name: str) -> CertificateData:
+    with state.lock:
+        try:
+            return state.certificates[name]
+        except KeyError:
+            raise FileNotFoundError(f'Found no certificate with name: {name}')
+
+
+def check_absent(state: MemoryState, package: PackageData) -> None:
+    if any(package.file_name in files.get(package.package_name, dict()) for files in (state.files, state.quarantine)):
+        raise FileExistsError(f'{package.package_name}/{package.file_name}')
+
+
+def insert(state: MemoryState, package: PackageData, upload_time: Optional[datetime] = None) -> None:
+    with state.lock:
+        check_absent(state, package)
+        stored: PackageData = package.copy(
+            update=dict(upload_time=upload_time if upload_time else datetime.utcnow())
+        )
+        state.files.setdefault(package.package_name, dict())[package.file_name] = stored
+        state.digests[(package.package_name, package.file_name)] = package.content_hexdigest()
+        insort(state.uploads, (stored.upload_time, stored.package_name, stored.file_name))
+        state.log_change(
+            PACKAGE_CHANGE, change_time=upload_time, package=package.package_name, file=package.file_name,
+            certificate=package.certificate
+        )
+
+
+def store(state: MemoryState, verify: bool, package: PackageData) -> None:
+    if verify:
+        verify_package_data(package, get_certificate(state, package.certificate))
+    insert(state, package)
+
+
+def store_batch(state: MemoryState, packages: Sequence[PackageData]) -> int:
+    stored: int = 0
+    with state.lock:
+        for package in packages:
+            try:
+                insert(state, package)
+            except FileExistsError:
+                continue
+            stored += 1
+    return stored
+
+
+def stored_files(state: MemoryState) -> Iterable[Tuple[PackageName, FileName]]:
+    with state.lock:
+        return tuple(
+            (package, file)
+            for collection in (state.files, state.quarantine) for package, files in collection.items() for file in files
+        )
+
+
+def read_stored_file(state: MemoryState, package: PackageName, file: FileName) -> StoredFile:
+    with state.lock:
+        quarantined: Optional[PackageData] = state.quarantine.get(package, dict()).get(file)
+        if quarantined is not None:
+            return StoredFile(quarantined, state.certificates[quarantined.certificate].compromised)
+        return StoredFile(retrieve(state, package, file), None)
+
+
+def write_stored_file(state: MemoryState, stored: StoredFile) -> None:
+    with state.lock:
+        if stored.quarantined is None:
+            insert(state, stored.package, stored.package.upload_time)
+            return
+        check_absent(state, stored.package)
+        state.quarantine.setdefault(stored.package.package_name, dict())[stored.package.file_name] = stored.package
+
+
+def remove(state: MemoryState, package: PackageName, file: FileName) -> None:
+    with state.lock:
+        if file in state.quarantine.get(package, dict()):
+            del state.quarantine[package][file]
+            if not state.quarantine[package]:
+                del state.quarantine[package]
+            return
+        stored: PackageData = retrieve(state, package, file)
+        del state.files[package][file]
+        if not state.files[package]:
+            del state.files[package]
+        state.uploads.remove((stored.upload_time, package, file))
+        state.digests.pop((package, file), None)
+
+
+def packages(state: MemoryState) -> Iterable[str]:
+    with state.lock:
+        return set(state.files)
+
+
+def certificates(state: MemoryState) -> Iterable[CertificateData]:
+    with state.lock:
+        return tuple(state.certificates.values())
+
+
+def add_certificate(state: MemoryState, certificate: CertificateData) -> None:
+    with state.lock:
+        if certificate.name in state.certificates:
+            raise FileExistsError(f'Certificate already exists: {certificate.name}')
+        state.certificates[certificate.name] = certificate.copy(update=dict(upload_time=datetime.utcnow()))
+        state.log_change(CERTIFICATE_CHANGE, certificate=certificate.name)
+
+
+def update_certificate(
+        state: MemoryState,
+        name: str,
+        disabled: Optional[datetime],
+        compromised: Optional[datetime]
+) -> None:
+    with state.lock:
+        certificate: CertificateData = get_certificate(state, name)
+        state.certificates[name] = certificate.copy(update=dict(disabled=disabled, compromised=compromised))
+        state.log_change(CERTIFICATE_STATE_CHANGE, certificate=name)
+
+
+def compromise_certificate(state: MemoryState, name: str, compromised: datetime) -> int:
+    with state.lock:
+        certificate: CertificateData = get_certificate(state, name)
+        state.certificates[name] = certificate.copy(update=dict(compromised=compromised))
+        state.log_change(CERTIFICATE_STATE_CHANGE, certificate=name)
+        signed: List[PackageData] = [
+            data for files in state.files.values() for data in files.values() if data.certificate == name
+        ]
+        for data in signed:
+            remove(state, data.package_name, data.file_name)
+            state.quarantine.setdefault(data.package_name, dict())[data.file_name] = data
+        return len(signed)
+
+
+def changes(state: MemoryState, cursor: str, limit: int) -> ChangeFeed:
+    since: int = int(cursor) if cursor else 0
+    with state.lock:
+        page: List[ChangeData] = [
+            change.copy(update=dict(signature=stored.signature, digest=stored.digest))
+            if (stored := state.files.get(change.package, dict()).get(change.file)) is not None
+            else change
+            for change in state.changes[since:since + limit]
+        ]
+    return ChangeFeed(changes=page, cursor=str(page[-1].sequence if page else since))
+
+
+def get_package_activities(state: MemoryState, begin: datetime, end: datetime) -> Iterable[PackageActivity]:
+    with state.lock:
+        uploads: List[Tuple[datetime, PackageName, FileName]] = state.uploads[
+            bisect_left(state.uploads, (begin, )):bisect_left(state.uploads, (end, ))
+        ]
+        return [
+            PackageActivity.from_package_data(state.files[package][file])
+            for _, package, file in reversed(uploads)
+        ]
+
+
+def record_downloads(state: MemoryState, counts: Sequence[DownloadCount]) -> None:
+    with state.lock:
+        for package, file, hour, downloads in counts:
+            state.downloads[(package, file, hour)] = state.downloads.get((package, file, hour), 0) + downloads
+
+
+def download_statistics(
+        state: MemoryState,
+        begin: datetime,
+        end: datetime,
+        package: Optional[PackageName] = None
+) -> Iterable[DownloadCount]:
+    with state.lock:
+        return tuple(
+            sorted(
+                (
+                    DownloadCount(counted, file, hour, downloads)
+                    for (counted, file, hour), downloads in state.downloads.items()
+                    if begin <= hour < end and (package is None or counted == package)
+                ),
+                key=lambda count: (count.hour, count.package, count.file)
+            )
+        )
+
+
+def create_memory_storage(verify: bool = True, snapshot: Optional[str] = None) -> Storage:
+    """
+    Creates a storage keeping all data in process memory.
+
+    Args:
+        verify: Verify signatures of stored packages.
+        snapshot: Optional file to restore the state from on creation and to write it to on interpreter exit.
+
+    >>> create_memory_storage(verify=False).packages()
+    set()
+    """
+    state: MemoryState = MemoryState()
+    if snapshot:
+        snapshot_path: Path = Path(snapshot)
+        if snapshot_path.exists():
+            state = load_snapshot(snapshot_path)
+        register(save_snapshot, state, snapshot_path)
+
+    return Storage(
+        store=partial(store, state, verify),
+        store_batch=partial(store_batch, state),
+        retrieve=partial(retrieve, state),
+        index=partial(index, state),
+        packages=partial(packages, state),
+        add_certificate=partial(add_certificate, state),
+        certificates=partial(certificates, state),
+        verify=verify,
+        package_activities=partial(get_package_activities, state),
+        update_certificate=partial(update_certificate, state),
+        changes=partial(changes, state),
+        stream=partial(stream, state),
+        remove=partial(remove, state),
+        stored_files=partial(stored_files, state),
+        read_stored_file=partial(read_stored_file, state),
+        write_stored_file=partial(write_stored_file, state),
+        compromise_certificate=partial(compromise_certificate, state),
+        record_downloads=partial(record_downloads, state),
+        download_statistics=partial(download_statistics, state)
+    )
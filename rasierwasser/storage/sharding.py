@@ -0,0 +1,244 @@
+from typing import Sequence, List, Iterable, Iterator, Callable, TypeVar, Dict, Set, Optional, Pattern, Tuple
+from datetime import datetime
+from functools import partial
+from hashlib import sha1
+from heapq import merge
+from itertools import islice
+from re import compile as compile_regex
+from concurrent.futures import ThreadPoolExecutor
+from rasierwasser.storage.algebra import (
+    Storage, PackageData, PackageRecord, PackageName, FileName, CertificateData, PackageActivity, ChangeData,
+    ChangeFeed, DownloadCount, StoredFile, CERTIFICATE_CHANGE, CERTIFICATE_STATE_CHANGE
+)
+
+
+NORMALISATION_PATTERN: Pattern = compile_regex(r'[-_.]+')
+CURSOR_SEPARATOR: str = '.'
+
+Result = TypeVar('Result')
+
+
+def normalise_package_name(package: PackageName) -> str:
+    """
+    >>> normalise_package_name('Foo_Bar.baz')
+    'foo-bar-baz'
+    """
+    return NORMALISATION_PATTERN.sub('-', package).lower()
+
+
+def shard_index(package: PackageName, shard_count: int) -> int:
+    """
+    Maps a package to a shard by a hash of its normalised name, which is stable across processes and releases.
+
+    >>> shard_index('foo-bar', 4) == shard_index('Foo_Bar', 4)
+    True
+    """
+    return int.from_bytes(sha1(normalise_package_name(package).encode('utf-8')).digest()[:8], 'big') % shard_count
+
+
+class ShardSet:
+    def __init__(self, shards: Sequence[Storage], workers: int) -> None:
+        self.shards: Sequence[Storage] = shards
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='rasierwasser-shards'
+        )
+
+    def route(self, package: PackageName) -> Storage:
+        return self.shards[shard_index(package, len(self.shards))]
+
+    def fan_out(self, operation: Callable[[Storage], Result]) -> List[Result]:
+        return list(self.executor.map(operation, self.shards))
+
+
+def store(shards: ShardSet, package: PackageData) -> None:
+    shards.route(package.package_name).store(package)
+
+
+def store_batch(shards: ShardSet, packages: Sequence[PackageData]) -> int:
+    batches: Dict[int, List[PackageData]] = dict()
+    for package in packages:
+        batches.setdefault(shard_index(package.package_name, len(shards.shards)), []).append(package)
+    return sum(
+        shards.executor.map(lambda position: shards.shards[position].store_batch(batches[position]), batches)
+    )
+
+
+def retrieve(shards: ShardSet, package: PackageName, file: FileName) -> PackageData:
+    return shards.route(package).retrieve(package, file)
+
+
+def stream(shards: ShardSet, package: PackageName, file: FileName) -> Iterable[bytes]:
+    return shards.route(package).stream(package, file)
+
+
+def remove(shards: ShardSet, package: PackageName, file: FileName) -> None:
+    shards.route(package).remove(package, file)
+
+
+def stored_files(shards: ShardSet) -> Iterable[Tuple[PackageName, FileName]]:
+    return [key for keys in shards.fan_out(lambda shard: shard.stored_files()) for key in keys]
+
+
+def read_stored_file(shards: ShardSet, package: PackageName, file: FileName) -> StoredFile:
+    return shards.route(package).read_stored_file(package, file)
+
+
+def write_stored_file(shards: ShardSet, stored: StoredFile) -> None:
+    shards.route(stored.package.package_name).write_stored_file(stored)
+
+
+def index(shards: ShardSet, package: PackageName) -> Iterable[PackageRecord]:
+    return shards.route(package).index(package)
+
+
+def packages(shards: ShardSet) -> Iterable[str]:
+    return set().union(*shards.fan_out(lambda shard: shard.packages()))
+
+
+def certificates(shards: ShardSet) -> Iterable[CertificateData]:
+    return shards.shards[0].certificates()
+
+
+def add_certificate(shards: ShardSet, certificate: CertificateData) -> None:
+    shards.fan_out(lambda shard: shard.add_certificate(certificate))
+
+
+def update_certificate(
+        shards: ShardSet,
+        name: str,
+        disabled: Optional[datetime],
+        compromised: Optional[datetime]
+) -> None:
+    shards.fan_out(lambda shard: shard.update_certificate(name, disabled, compromised))
+
+
+def compromise_certificate(shards: ShardSet, name: str, compromised: datetime) -> int:
+    return sum(shards.fan_out(lambda shard: shard.compromise_certificate(name, compromised)))
+
+
+def record_downloads(shards: ShardSet, counts: Sequence[DownloadCount]) -> None:
+    batches: Dict[int, List[DownloadCount]] = dict()
+    for count in counts:
+        batches.setdefault(shard_index(count.package, len(shards.shards)), []).append(count)
+    list(shards.executor.map(lambda position: shards.shards[position].record_downloads(batches[position]), batches))
+
+
+def download_statistics(
+        shards: ShardSet,
+        begin: datetime,
+        end: datetime,
+        package: Optional[PackageName] = None
+) -> Iterable[DownloadCount]:
+    if package is not None:
+        return shards.route(package).download_statistics(begin, end, package)
+    return list(
+        merge(
+            *shards.fan_out(lambda shard: shard.download_statistics(begin, end, None)),
+            key=lambda count: (count.hour, count.package, count.file)
+        )
+    )
+
+
+def package_activities(shards: ShardSet, begin: datetime, end: datetime) -> Iterable[PackageActivity]:
+    return list(
+        merge(
+            *shards.fan_out(lambda shard: shard.package_activities(begin, end)),
+            key=lambda activity: activity.upload_time,
+            reverse=True
+        )
+    )
+
+
+def changes(shards: ShardSet, cursor: str, limit: int) -> ChangeFeed:
+    """
+    Merges the change logs of all shards by change time. The cursor holds the position in every shard's log.
+    Certificate changes are replicated to every shard, so they are only taken from the first one; the
+    replicated copies in the other shards are skipped but still advance the cursor. Shards can only be appended,
+    so a cursor with fewer positions than shards is continued from the start of the logs of the new shards.
+    """
+    cursors: List[str] = cursor.split(CURSOR_SEPARATOR) if cursor else []
+    if len(cursors) > len(shards.shards):
+        raise ValueError(f'Cursor does not match the number of shards: {cursor}')
+    cursors.extend([''] * (len(shards.shards) - len(cursors)))
+    replicated: Set[str] = {CERTIFICATE_CHANGE, CERTIFICATE_STATE_CHANGE}
+    page: List[ChangeData] = []
+    consumed: bool = True
+    while not page and consumed:
+        feeds: List[ChangeFeed] = list(
+            shards.executor.map(lambda shard, shard_cursor: shard.changes(shard_cursor, limit), shards.shards, cursors)
+        )
+        candidates: Iterable[Tuple[datetime, int, int, ChangeData]] = merge(
+            *(
+                [(change.change_time, position, change.sequence, change) for change in feed.changes]
+                for position, feed in enumerate(feeds)
+            )
+        )
+        consumed = False
+        for _, position, _, change in islice(candidates, limit):
+            consumed = True
+            cursors[position] = str(change.sequence)
+            if position == 0 or change.kind not in replicated:
+                page.append(change)
+    return ChangeFeed(changes=page, cursor=CURSOR_SEPARATOR.join(cursors))
+
+
+def create_sharded_storage(shards: Sequence[Storage], workers: int = 8) -> Storage:
+    """
+    Distributes packages over several storages by a stable hash of their normalised name. Certificates are
+    replicated to every shard, so each shard can verify its packages on its own.
+    """
+    shard_set: ShardSet = ShardSet(shards, workers)
+    return Storage(
+        store=partial(store, shard_set),
+        store_batch=partial(store_batch, shard_set),
+        retrieve=partial(retrieve, shard_set),
+        index=partial(index, shard_set),
+        packages=partial(packages, shard_set),
+        add_certificate=partial(add_certificate, shard_set),
+        certificates=partial(certificates, shard_set),
+        verify=all(shard.verify for shard in shards),
+        package_activities=partial(package_activities, shard_set),
+        update_certificate=partial(update_certificate, shard_set),
+        changes=partial(changes, shard_set),
+        stream=partial(stream, shard_set),
+        remove=partial(remove, shard_set),
+        stored_files=partial(stored_files, shard_set),
+        read_stored_file=partial(read_stored_file, shard_set),
+        write_stored_file=partial(write_stored_file, shard_set),
+        compromise_certificate=partial(compromise_certificate, shard_set),
+        record_downloads=partial(record_downloads, shard_set),
+        download_statistics=partial(download_statistics, shard_set)
+    )
+
+
+def rebalance_shards(shards: Sequence[Storage], previous_count: int) -> Iterator[Tuple[PackageName, int, int, int]]:
+    """
+    Moves files to the shard they are routed to after the number of shards grew from previous_count to the
+    number of given shards. The first previous_count shards have to be the existing ones in their previous
+    order. Files are copied before they are removed from their old shard, so an interrupted run can be repeated.
+    Quarantined files are moved as well and all files keep their upload time, so moves do not show up as uploads.
+    Yields the package, its previous shard, its new shard and the number of moved files for every moved package.
+    """
+    existing: Dict[str, CertificateData] = dict((c.name, c) for c in shards[0].certificates())
+    for shard in shards[previous_count:]:
+        known: Set[str] = set(certificate.name for certificate in shard.certificates())
+        for certificate in existing.values():
+            if certificate.name not in known:
+                shard.add_certificate(certificate)
+                if certificate.disabled or certificate.compromised:
+                    shard.update_certificate(certificate.name, certificate.disabled, certificate.compromised)
+
+    for position, shard in enumerate(shards[:previous_count]):
+        moving: Dict[PackageName, List[FileName]] = dict()
+        for package, file in shard.stored_files():
+            if shard_index(package, len(shards)) != position:
+                moving.setdefault(package, []).append(file)
+        for package in sorted(moving):
+            target: int = shard_index(package, len(shards))
+            for file in moving[package]:
+                try:
+                    shards[target].write_stored_file(shard.read_stored_file(package, file))
+                except FileExistsError:
+                    pass
+                shard.remove(package, file)
+            yield package, position, target, len(moving[package])
@@ -2,7 +2,7 @@ from typing import Union
 from hashlib import sha1
 from io import BytesIO
 from OpenSSL.crypto import verify, load_certificate, FILETYPE_PEM, X509, Error
-from zipfile import ZipFile
+from zipfile import ZipFile, BadZipFile
 from rasierwasser.storage.algebra import CertificateData, PackageData
 
 
@@ -15,9 +15,15 @@ def get_normalised_package_content(package: Union[PackageData, bytes]) -> bytes:
 
 
 def verify_package_data(package: PackageData, certificate: CertificateData) -> None:
+    if certificate.compromised is not None:
+        raise ValueError(f'Certificate {certificate.name} has been compromised, it can not be used for new packages')
     cert: X509 = load_certificate(FILETYPE_PEM, certificate.public_key)
     try:
-        verify(cert, package.signature, get_normalised_package_content(package), package.digest)
+        content: bytes = get_normalised_package_content(package)
+    except BadZipFile:
+        raise ValueError(f'Got invalid package {package.package_name}/{package.file_name}: Not a zip file')
+    try:
+        verify(cert, package.signature, content, package.digest)
     except Error:
         sig_fingerprint: str = sha1(package.signature).hexdigest()
         raise ValueError(
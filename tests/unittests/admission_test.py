@@ -0,0 +1,108 @@
+from typing import List, Dict, Any, Tuple
+from asyncio import run, gather, sleep, Event
+from unittest import TestCase
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Scope, Message
+from rasierwasser.configuration.server import AdmissionConfig, ServerConfig
+from rasierwasser.storage.algebra import CertificateData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.server.fastapi.admission import AdmissionMiddleware
+from rasierwasser.server.fastapi.fastapi import create_fastapi_server
+
+
+def create_scope(method: str, path: str, headers: List[Tuple[bytes, bytes]] = ()) -> Scope:
+    return dict(
+        type='http', method=method, path=path, raw_path=path.encode(), root_path='', headers=list(headers),
+        query_string=b'', http_version='1.1', scheme='http', server=('localhost', 8080), client=('localhost', 1)
+    )
+
+
+class AdmissionTest(TestCase):
+
+    def setUp(self) -> None:
+        self.release: Event = Event()
+        self.config: AdmissionConfig = AdmissionConfig(
+            max_upload_bytes=8, max_concurrent_requests=3, read_reserve=1, max_concurrent_uploads=1,
+            max_queued_uploads=1, queue_timeout=0.1, retry_after=7
+        )
+
+    async def blocking_app(self, scope: Scope, receive, send) -> None:
+        while (await receive()).get('more_body', False):
+            pass
+        if scope['method'] == 'PUT':
+            await self.release.wait()
+        await send(dict(type='http.response.start', status=200, headers=[]))
+        await send(dict(type='http.response.body', body=b''))
+
+    async def call(
+            self,
+            middleware: ASGIApp,
+            scope: Scope,
+            chunks: List[bytes] = (b'', )
+    ) -> Tuple[int, Dict[str, str]]:
+        messages: List[Message] = [
+            dict(type='http.request', body=chunk, more_body=position < len(chunks) - 1)
+            for position, chunk in enumerate(chunks)
+        ]
+        sent: List[Dict[str, Any]] = []
+
+        async def receive() -> Message:
+            return messages.pop(0) if messages else dict(type='http.disconnect')
+
+        async def send(message: Message) -> None:
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        start: Dict[str, Any] = sent[0]
+        return start['status'], dict((name.decode(), value.decode()) for name, value in start['headers'])
+
+    def test_body_limit(self):
+        middleware: AdmissionMiddleware = AdmissionMiddleware(self.blocking_app, self.config)
+        status, headers = run(
+            self.call(middleware, create_scope('POST', '/packages', [(b'content-length', b'9')]))
+        )
+        self.assertEqual(status, 413)
+        self.assertNotIn('retry-after', headers)
+        self.assertEqual(run(self.call(middleware, create_scope('POST', '/packages'), [b'1234', b'5678']))[0], 200)
+
+    def test_body_limit_while_streaming(self):
+        storage: Storage = create_memory_storage(verify=False)
+        storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        server: FastAPI = create_fastapi_server(
+            storage, server_config=ServerConfig(hostname='localhost', port=8080, admission=self.config)
+        )
+        headers: List[Tuple[bytes, bytes]] = [
+            (b'x-rasierwasser-certificate', b'A'), (b'x-rasierwasser-signature', b'U0lH')
+        ]
+        status, _ = run(
+            self.call(server, create_scope('PUT', '/packages/alib/alib-0.0.1.whl', headers), [b'12345', b'6789'])
+        )
+        self.assertEqual(status, 413)
+        self.assertEqual(list(storage.packages()), [])
+
+    def test_upload_backpressure(self):
+        middleware: AdmissionMiddleware = AdmissionMiddleware(self.blocking_app, self.config)
+
+        async def scenario():
+            running = [
+                self.call(middleware, create_scope('PUT', '/packages/alib/alib-0.0.1.whl')),
+                self.call(middleware, create_scope('PUT', '/packages/alib/alib-0.0.2.whl'))
+            ]
+
+            async def follow_up():
+                await sleep(0.01)
+                rejected = await self.call(middleware, create_scope('PUT', '/packages/alib/alib-0.0.3.whl'))
+                read = await self.call(middleware, create_scope('GET', '/packages/alib'))
+                await sleep(0.2)
+                self.release.set()
+                return rejected, read
+
+            return await gather(*running, follow_up())
+
+        active, timed_out, (rejected, read) = run(scenario())
+        self.assertEqual(active[0], 200)
+        self.assertEqual(timed_out[0], 503)
+        self.assertEqual(timed_out[1]['retry-after'], '7')
+        self.assertEqual(rejected[0], 429)
+        self.assertEqual(rejected[1]['retry-after'], '7')
+        self.assertEqual(read[0], 200, 'Reads have to be served while uploads are saturated.')
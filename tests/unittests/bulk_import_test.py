@@ -0,0 +1,60 @@
+from typing import Dict, List
+from pathlib import Path
+from json import dump
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.helper.upload import collect_uploads
+from rasierwasser.service.bulk_import import import_files, load_checkpoint, IMPORTED, SKIPPED, REJECTED
+
+
+class BulkImportTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.root: Path = Path(self.tempdir.name)
+        self.checkpoint: Path = self.root.joinpath('checkpoint.json')
+        self.storage: Storage = create_memory_storage(verify=False)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        self.wheels: Path = self.root.joinpath('wheels')
+        self.wheels.mkdir()
+        for package, version in (('alib', '0.0.1'), ('alib', '0.0.2'), ('blib', '0.0.1')):
+            wheel: Path = self.wheels.joinpath(f'{package}-{version}-py3-none-any.whl')
+            wheel.write_bytes(wheel.name.encode())
+            with open(f'{wheel}.sig.json', 'w', encoding='utf-8') as out:
+                dump(dict(package=package, filename=wheel.name, signature_base64='U0lH', certificate='A'), out)
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def import_files(self) -> Dict[str, int]:
+        return import_files(self.storage, collect_uploads([str(self.wheels)]), self.checkpoint, 2, 2)
+
+    def test_import(self):
+        self.storage.store(
+            PackageData(
+                package_name='blib', file_name='blib-0.0.1-py3-none-any.whl', file_content=b'B', signature=b'SIG',
+                certificate='A'
+            )
+        )
+        self.assertEqual(self.import_files(), {IMPORTED: 2, SKIPPED: 1})
+        self.assertEqual(
+            self.storage.retrieve('alib', 'alib-0.0.2-py3-none-any.whl').file_content, b'alib-0.0.2-py3-none-any.whl'
+        )
+        self.assertEqual(len(self.checkpoint.read_text(encoding='utf-8').splitlines()), 2, 'Expected a line per batch.')
+        self.assertEqual(len(load_checkpoint(self.checkpoint)), 3)
+        self.assertEqual(self.import_files(), dict(), 'Imported files have to be skipped after a restart.')
+
+    def test_resume_and_reject(self):
+        with self.checkpoint.open('w', encoding='utf-8') as out:
+            out.write('["alib/alib-0.0.1-py3-none-any.whl"]\n["alib/alib-0.0.2-py3')
+        uploads: List[Dict[str, str]] = collect_uploads([str(self.wheels)])
+        uploads[-1]['content_sha512'] = 'invalid'
+        self.assertEqual(import_files(self.storage, uploads, self.checkpoint, 2, 2), {IMPORTED: 1, REJECTED: 1})
+        self.assertEqual(sorted(self.storage.packages()), ['alib'])
+        self.assertEqual([file.file_name for file in self.storage.index('alib')], ['alib-0.0.2-py3-none-any.whl'])
+        self.assertEqual(
+            load_checkpoint(self.checkpoint), {'alib/alib-0.0.1-py3-none-any.whl', 'alib/alib-0.0.2-py3-none-any.whl'},
+            'A line cut short by an interruption has to be dropped.'
+        )
@@ -1,10 +1,18 @@
 from typing import List
 from pathlib import Path
+from datetime import datetime
+from hashlib import sha512
 from unittest import TestCase
+from unittest.mock import patch
 from tempfile import TemporaryDirectory
 from os.path import join, exists
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.orm import Session
 from OpenSSL.crypto import load_privatekey, FILETYPE_PEM, PKey, sign
-from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.algebra import (
+    CertificateData, PackageData, PackageRecord, ChangeFeed, DownloadCount, StoredFile,
+    PACKAGE_CHANGE, CERTIFICATE_CHANGE, CERTIFICATE_STATE_CHANGE
+)
 from rasierwasser.storage.validation import verify_package_data
 from rasierwasser.storage.database.engine import create_database_storage, Storage
 
@@ -79,3 +87,205 @@ class DatabaseEngineTest(TestCase):
         storage.add_certificate(certificate)
         storage.store(package)
 
+    def test_change_feed(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        storage.store(
+            PackageData(
+                package_name='Alib', file_name='alib-0.0.1.whl', file_content=b'alib', signature=b'SIG', certificate='A'
+            )
+        )
+        storage.update_certificate('A', None, datetime.now())
+        feed: ChangeFeed = storage.changes('', 2)
+        self.assertEqual(
+            [(change.kind, change.package, change.certificate) for change in feed.changes],
+            [(CERTIFICATE_CHANGE, None, 'A'), (PACKAGE_CHANGE, 'Alib', 'A')]
+        )
+        self.assertEqual(feed.changes[-1].signature, b'SIG', 'Package changes have to carry the signature.')
+        remaining: ChangeFeed = storage.changes(feed.cursor, 2)
+        self.assertEqual([change.kind for change in remaining.changes], [CERTIFICATE_STATE_CHANGE])
+        self.assertEqual(storage.changes(remaining.cursor, 2).changes, [], 'Feed has to be exhausted.')
+
+    def test_index_records(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        for file in ('alib-0.0.1.whl', 'alib-0.0.2.whl'):
+            storage.store(
+                PackageData(
+                    package_name='Alib', file_name=file, file_content=b'alib', signature=b'SIG', certificate='A'
+                )
+            )
+        records: List[PackageRecord] = sorted(storage.index('Alib'))
+        self.assertEqual([(record.file_name, record.signature) for record in records],
+                         [('alib-0.0.1.whl', b'SIG'), ('alib-0.0.2.whl', b'SIG')])
+        self.assertFalse(hasattr(records[0], 'file_content'), 'Index records must not carry the file content.')
+        self.assertEqual(records[0].content_sha512, sha512(b'alib').hexdigest())
+        self.assertEqual(storage.packages(), {'Alib'})
+        self.assertEqual(
+            [activity.file for activity in storage.package_activities(datetime.min, datetime.max)],
+            ['alib-0.0.2.whl', 'alib-0.0.1.whl']
+        )
+
+    def test_compromise_certificate(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        for name in ('A', 'B'):
+            storage.add_certificate(CertificateData(name=name, public_key=name.encode()))
+        for number in range(3):
+            storage.store(
+                PackageData(
+                    package_name='Alib', file_name=f'alib-0.0.{number}.whl', file_content=b'alib', signature=b'SIG',
+                    certificate='A' if number else 'B'
+                )
+            )
+        self.assertEqual(storage.compromise_certificate('A', datetime.utcnow()), 2)
+        self.assertEqual([record.file_name for record in storage.index('Alib')], ['alib-0.0.0.whl'])
+        self.assertRaises(FileNotFoundError, lambda: storage.retrieve('Alib', 'alib-0.0.1.whl'))
+        self.assertRaises(FileNotFoundError, lambda: storage.stream('Alib', 'alib-0.0.1.whl'))
+        self.assertEqual(
+            [change.signature for change in storage.changes('', 10).changes if change.file == 'alib-0.0.1.whl'],
+            [None], 'Quarantined files must not be replicated.'
+        )
+        self.assertEqual(storage.compromise_certificate('A', datetime.utcnow()), 0)
+
+    def test_stream(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        content: bytes = bytes(range(256)) * 10
+        storage.store(
+            PackageData(
+                package_name='Alib', file_name='alib-0.0.1.whl', file_content=content, signature=b'SIG', certificate='A'
+            )
+        )
+        with patch('rasierwasser.storage.database.engine.STREAM_CHUNK_SIZE', 1000):
+            chunks: List[bytes] = list(storage.stream('Alib', 'alib-0.0.1.whl'))
+        self.assertEqual([len(chunk) for chunk in chunks], [1000, 1000, 560])
+        self.assertEqual(b''.join(chunks), content)
+        self.assertRaises(FileNotFoundError, lambda: storage.stream('Alib', 'alib-0.0.2.whl'))
+
+    def test_move_stored_files(self):
+        source: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/source.sqlite', verify=False)
+        target: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/target.sqlite', verify=False)
+        for storage in (source, target):
+            for name in ('A', 'B'):
+                storage.add_certificate(CertificateData(name=name, public_key=name.encode()))
+        for file, certificate in (('alib-0.0.1.whl', 'A'), ('alib-0.0.2.whl', 'B')):
+            source.store(
+                PackageData(
+                    package_name='Alib', file_name=file, file_content=file.encode(), signature=b'S',
+                    certificate=certificate
+                )
+            )
+        source.compromise_certificate('B', datetime.utcnow())
+        self.assertEqual(sorted(source.stored_files()), [('Alib', 'alib-0.0.1.whl'), ('Alib', 'alib-0.0.2.whl')])
+        for package, file in source.stored_files():
+            target.write_stored_file(source.read_stored_file(package, file))
+            source.remove(package, file)
+        self.assertEqual(source.stored_files(), ())
+        self.assertRaises(
+            FileExistsError, lambda: target.write_stored_file(target.read_stored_file('Alib', 'alib-0.0.1.whl'))
+        )
+        moved: StoredFile = target.read_stored_file('Alib', 'alib-0.0.2.whl')
+        self.assertIsNotNone(moved.quarantined)
+        self.assertEqual([record.file_name for record in target.index('Alib')], ['alib-0.0.1.whl'])
+        self.assertEqual(
+            [change.change_time for change in target.changes('', 10).changes if change.file is not None],
+            [record.upload_time for record in target.index('Alib')],
+            'Moved files have to be logged at their upload time.'
+        )
+
+    def test_schema_migration(self):
+        db_url: str = f'sqlite:////{self.tempdir.name}/{self.db_name}'
+        with create_engine(db_url).begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE packages (package TEXT, file TEXT, content BLOB, signature BLOB, certificate TEXT, '
+                'digest TEXT, upload_time DATETIME, PRIMARY KEY (package, file))'
+            ))
+            connection.execute(
+                text("INSERT INTO packages VALUES ('Alib', 'alib-0.0.1.whl', X'41', X'53', 'A', NULL, NULL)")
+            )
+            connection.execute(
+                text("INSERT INTO packages VALUES ('Alib', 'alib-0.0.2.whl', NULL, X'53', 'A', NULL, NULL)")
+            )
+        storage: Storage = create_database_storage(db_url, verify=False)
+        self.assertEqual(
+            [(record.file_name, record.content_sha512) for record in storage.index('Alib')],
+            [('alib-0.0.1.whl', sha512(b'A').hexdigest()), ('alib-0.0.2.whl', None)]
+        )
+        create_database_storage(db_url, verify=False)
+
+    def test_change_log_seeding(self):
+        db_url: str = f'sqlite:////{self.tempdir.name}/{self.db_name}'
+        with create_engine(db_url).begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE certificates (name TEXT PRIMARY KEY, public_key BLOB, upload_time DATETIME, '
+                'disabled DATETIME, compromised DATETIME)'
+            ))
+            connection.execute(text(
+                'CREATE TABLE packages (package TEXT, file TEXT, content BLOB, signature BLOB, certificate TEXT, '
+                'digest TEXT, upload_time DATETIME, PRIMARY KEY (package, file))'
+            ))
+            connection.execute(text(
+                "INSERT INTO packages VALUES ('Alib', 'alib-0.0.1.whl', X'41', X'53', 'A', NULL, '2021-06-01 12:00:00')"
+            ))
+            connection.execute(
+                text("INSERT INTO certificates VALUES ('A', X'41', '2021-06-01 11:00:00', NULL, NULL)")
+            )
+        storage: Storage = create_database_storage(db_url, verify=False)
+        feed: ChangeFeed = storage.changes('', 100)
+        self.assertEqual(
+            [(change.kind, change.package, change.signature) for change in feed.changes],
+            [(CERTIFICATE_CHANGE, None, None), (PACKAGE_CHANGE, 'Alib', b'S')]
+        )
+        storage.add_certificate(CertificateData(name='B', public_key=b'B'))
+        self.assertEqual(len(create_database_storage(db_url, verify=False).changes('', 100).changes), 3)
+
+    def test_store_batch(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        batch: List[PackageData] = [
+            PackageData(
+                package_name='Alib', file_name=f'alib-0.0.{number}.whl', file_content=b'alib', signature=b'SIG',
+                certificate='A'
+            )
+            for number in range(3)
+        ]
+        storage.store(batch[0])
+        self.assertEqual(storage.store_batch(batch), 2)
+        self.assertEqual(len(list(storage.index('Alib'))), 3)
+        self.assertEqual(storage.store_batch(batch), 0)
+        self.assertEqual(len(storage.changes('', 10).changes), 4)
+
+    def test_store_batch_collision(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        batch: List[PackageData] = [
+            PackageData(
+                package_name='Alib', file_name=f'alib-0.0.{number}.whl', file_content=b'alib', signature=b'SIG',
+                certificate='A'
+            )
+            for number in range(3)
+        ]
+        event.listen(Session, 'before_flush', lambda *_: storage.store(batch[1]), once=True)
+        self.assertEqual(storage.store_batch(batch), 2, 'Files stored by another writer have to be skipped.')
+        self.assertEqual(len(list(storage.index('Alib'))), 3)
+        self.assertEqual(len(storage.changes('', 10).changes), 4)
+
+    def test_download_statistics(self):
+        storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/{self.db_name}', verify=False)
+        hour: datetime = datetime(2021, 6, 1, 12)
+        later: datetime = datetime(2021, 6, 1, 13)
+        storage.record_downloads([DownloadCount('Alib', 'alib-0.0.1.whl', hour, 2)])
+        storage.record_downloads(
+            [DownloadCount('Alib', 'alib-0.0.1.whl', hour, 3), DownloadCount('Alib', 'alib-0.0.1.whl', later, 1)]
+        )
+        self.assertEqual(
+            list(storage.download_statistics(datetime.min, datetime.max)),
+            [DownloadCount('Alib', 'alib-0.0.1.whl', hour, 5), DownloadCount('Alib', 'alib-0.0.1.whl', later, 1)]
+        )
+        self.assertEqual(
+            list(storage.download_statistics(later, datetime.max)), [DownloadCount('Alib', 'alib-0.0.1.whl', later, 1)]
+        )
+        storage.record_downloads([DownloadCount('Blib', 'blib-0.0.1.whl', hour, 4)])
+        self.assertEqual(
+            list(storage.download_statistics(datetime.min, datetime.max, 'Blib')),
+            [DownloadCount('Blib', 'blib-0.0.1.whl', hour, 4)]
+        )
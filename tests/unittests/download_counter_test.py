@@ -0,0 +1,53 @@
+from typing import List
+from datetime import datetime
+from unittest import TestCase
+from rasierwasser.storage.algebra import DownloadCount
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.server.downloads import DownloadCounter
+
+
+class DownloadCounterTest(TestCase):
+
+    def setUp(self) -> None:
+        self.storage: Storage = create_memory_storage(verify=False)
+        self.counter: DownloadCounter = DownloadCounter(self.storage, 3600.0)
+
+    def test_flush(self):
+        for _ in range(3):
+            self.counter.record('Alib', 'alib-0.0.1.whl')
+        self.counter.record('Blib', 'blib-0.0.1.whl')
+        self.assertEqual(list(self.storage.download_statistics(datetime.min, datetime.max)), [])
+        self.counter.flush()
+        counts: List[DownloadCount] = list(self.storage.download_statistics(datetime.min, datetime.max))
+        self.assertEqual([(count.package, count.downloads) for count in counts], [('Alib', 3), ('Blib', 1)])
+        self.assertEqual(counts[0].hour.minute, 0)
+        self.counter.record('Alib', 'alib-0.0.1.whl')
+        self.counter.flush()
+        self.assertEqual(self.storage.download_statistics(datetime.min, datetime.max)[0].downloads, 4)
+
+    def test_flush_on_shutdown(self):
+        self.counter.start()
+        self.counter.record('Alib', 'alib-0.0.1.whl')
+        self.counter.shutdown()
+        self.assertEqual(
+            [count.downloads for count in self.storage.download_statistics(datetime.min, datetime.max)], [1]
+        )
+
+    def test_failed_flush_is_retried(self):
+        failures: List[str] = ['database is locked']
+
+        def record_downloads(counts: List[DownloadCount]) -> None:
+            if failures:
+                raise OSError(failures.pop())
+            self.storage.record_downloads(counts)
+
+        counter: DownloadCounter = DownloadCounter(
+            self.storage.copy(update=dict(record_downloads=record_downloads)), 3600.0
+        )
+        counter.record('Alib', 'alib-0.0.1.whl')
+        counter.flush()
+        counter.record('Alib', 'alib-0.0.1.whl')
+        counter.flush()
+        self.assertEqual(
+            [count.downloads for count in self.storage.download_statistics(datetime.min, datetime.max)], [2]
+        )
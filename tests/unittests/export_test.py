@@ -0,0 +1,62 @@
+from pathlib import Path
+from json import load
+from datetime import datetime
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.database.engine import create_database_storage, Storage
+from rasierwasser.service.export import export_repository
+
+
+class ExportTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.target: Path = Path(self.tempdir.name).joinpath('export')
+        self.storage: Storage = create_database_storage(f'sqlite:////{self.tempdir.name}/sample.sqlite', verify=False)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def store(self, package: str, file: str) -> None:
+        self.storage.store(
+            PackageData(package_name=package, file_name=file, file_content=file.encode(), signature=b'S', certificate='A')
+        )
+
+    def test_export_layout(self):
+        self.store('Alib', 'alib-0.0.1.whl')
+        self.assertEqual(export_repository(self.storage, self.target), {'Alib'})
+        package_dir: Path = self.target.joinpath('packages', 'Alib')
+        self.assertEqual(package_dir.joinpath('alib-0.0.1.whl').read_bytes(), b'alib-0.0.1.whl')
+        self.assertIn('/packages/Alib/alib-0.0.1.whl', package_dir.joinpath('index.html').read_text())
+        with package_dir.joinpath('index.json').open() as src:
+            self.assertEqual([file['filename'] for file in load(src)['files']], ['alib-0.0.1.whl'])
+        with self.target.joinpath('packages', 'index.json').open() as src:
+            self.assertEqual(load(src)['projects'], [dict(name='Alib')])
+
+    def test_incremental_export(self):
+        self.store('Alib', 'alib-0.0.1.whl')
+        self.store('Blib', 'blib-0.0.1.whl')
+        export_repository(self.storage, self.target)
+        self.assertEqual(export_repository(self.storage, self.target), set(), 'Unchanged packages were exported.')
+        self.store('Blib', 'blib-0.0.2.whl')
+        self.assertEqual(export_repository(self.storage, self.target), {'Blib'})
+        self.assertTrue(self.target.joinpath('packages', 'Blib', 'blib-0.0.2.whl').exists())
+
+    def test_quarantine_export(self):
+        self.storage.add_certificate(CertificateData(name='B', public_key=b'B'))
+        self.store('Alib', 'alib-0.0.1.whl')
+        self.storage.store(
+            PackageData(
+                package_name='Alib', file_name='alib-0.0.2.whl', file_content=b'alib', signature=b'S', certificate='B'
+            )
+        )
+        export_repository(self.storage, self.target)
+        self.storage.compromise_certificate('B', datetime.utcnow())
+        self.assertEqual(export_repository(self.storage, self.target), {'Alib'})
+        package_dir: Path = self.target.joinpath('packages', 'Alib')
+        self.assertFalse(package_dir.joinpath('alib-0.0.2.whl').exists(), 'Quarantined file is still exported.')
+        with package_dir.joinpath('index.json').open() as src:
+            self.assertEqual([file['filename'] for file in load(src)['files']], ['alib-0.0.1.whl'])
+        self.assertEqual(export_repository(self.storage, self.target), set())
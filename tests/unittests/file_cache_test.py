@@ -0,0 +1,78 @@
+from typing import List, Tuple
+from datetime import datetime
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from rasierwasser.storage.algebra import PackageData, CertificateData, PackageName, FileName
+from rasierwasser.storage.cache import FileCache, create_cached_storage
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.storage.database.engine import create_database_storage
+
+
+def package_data(file: str, size: int) -> PackageData:
+    return PackageData(package_name='Alib', file_name=file, file_content=b'x' * size, signature=b'S', certificate='A')
+
+
+class FileCacheTest(TestCase):
+
+    def test_eviction_by_size(self):
+        cache: FileCache = FileCache(10)
+        cache.put(('Alib', 'a'), package_data('a', 4))
+        cache.put(('Alib', 'b'), package_data('b', 4))
+        cache.get(('Alib', 'a'))
+        cache.put(('Alib', 'c'), package_data('c', 4))
+        self.assertIsNone(cache.get(('Alib', 'b')), 'Least recently used file has not been evicted.')
+        self.assertIsNotNone(cache.get(('Alib', 'a')))
+        self.assertEqual(cache.statistics()['resident_bytes'], 8)
+
+    def test_oversized_files_are_not_cached(self):
+        cache: FileCache = FileCache(10)
+        cache.put(('Alib', 'a'), package_data('a', 11))
+        self.assertEqual(cache.statistics()['entries'], 0)
+
+    def test_cached_storage(self):
+        calls: List[Tuple[PackageName, FileName]] = []
+        backend: Storage = create_memory_storage(verify=False)
+        backend.add_certificate(CertificateData(name='A', public_key=b'A'))
+        backend.store(package_data('a', 4))
+        backend_retrieve = backend.retrieve
+        backend = backend.copy(update=dict(retrieve=lambda p, f: calls.append((p, f)) or backend_retrieve(p, f)))
+        storage: Storage = create_cached_storage(backend, 100)
+        for _ in range(3):
+            self.assertEqual(storage.retrieve('Alib', 'a').file_content, b'xxxx')
+        self.assertEqual(calls, [('Alib', 'a')], 'Cached file has been retrieved from the backend again.')
+        self.assertAlmostEqual(storage.statistics()['hit_ratio'], 2 / 3)
+
+    def test_quarantine_by_other_process(self):
+        backend: Storage = create_memory_storage(verify=False)
+        backend.add_certificate(CertificateData(name='A', public_key=b'A'))
+        backend.store(package_data('a', 4))
+        storage: Storage = create_cached_storage(backend, 100, refresh_interval=0)
+        self.assertEqual(storage.retrieve('Alib', 'a').file_content, b'xxxx')
+        backend.compromise_certificate('A', datetime.utcnow())
+        self.assertRaises(FileNotFoundError, lambda: storage.retrieve('Alib', 'a'))
+        self.assertRaises(FileNotFoundError, lambda: storage.stream('Alib', 'a'))
+        self.assertEqual(storage.statistics()['entries'], 0)
+
+    def test_hits_do_not_query_the_database(self):
+        statements: List[str] = []
+
+        def count(conn, cursor, statement, parameters, context, executemany) -> None:
+            statements.append(statement)
+
+        with TemporaryDirectory() as tempdir:
+            backend: Storage = create_database_storage(f'sqlite:////{tempdir}/sample.sqlite', verify=False)
+            backend.add_certificate(CertificateData(name='A', public_key=b'A'))
+            backend.store(package_data('a', 4))
+            storage: Storage = create_cached_storage(backend, 100)
+            for _ in range(2):
+                storage.retrieve('Alib', 'a')
+            event.listen(Engine, 'before_cursor_execute', count)
+            try:
+                for _ in range(10):
+                    self.assertEqual(storage.retrieve('Alib', 'a').file_content, b'xxxx')
+                    self.assertEqual(b''.join(storage.stream('Alib', 'a')), b'xxxx')
+            finally:
+                event.remove(Engine, 'before_cursor_execute', count)
+        self.assertEqual(statements, [], 'Cache hits have queried the database.')
@@ -0,0 +1,60 @@
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZipFile
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from OpenSSL.crypto import load_privatekey, sign, FILETYPE_PEM, PKey
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.storage.validation import get_normalised_package_content
+from rasierwasser.server.fastapi.fastapi import create_fastapi_server
+from rasierwasser.service.follower import follow, load_cursor
+from server_helper import RunningServer
+
+
+class FollowerTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.cursor_file: Path = Path(self.tempdir.name).joinpath('cursor')
+        data_dir: Path = Path(__file__).parent.joinpath('data', 'signing')
+        self.private_key: PKey = load_privatekey(FILETYPE_PEM, data_dir.joinpath('key.pem').read_bytes(), b'TEST')
+        self.upstream: Storage = create_memory_storage(verify=True)
+        self.upstream.add_certificate(
+            CertificateData(name='base', public_key=data_dir.joinpath('cert.pem').read_bytes())
+        )
+        self.downstream: Storage = create_memory_storage(verify=False)
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def store(self, package: str, version: str) -> bytes:
+        buffer: BytesIO = BytesIO()
+        with ZipFile(buffer, 'w') as wheel:
+            wheel.writestr(f'{package}/__init__.py', f'VERSION = "{version}"\n')
+        content: bytes = buffer.getvalue()
+        self.upstream.store(
+            PackageData(
+                package_name=package, file_name=f'{package}-{version}-py3-none-any.whl', file_content=content,
+                signature=sign(self.private_key, get_normalised_package_content(content), 'sha512'), certificate='base'
+            )
+        )
+        return content
+
+    def test_follow(self):
+        first: bytes = self.store('alib', '0.0.1')
+        with RunningServer(create_fastapi_server(self.upstream)) as url:
+            follow(self.downstream, url, self.cursor_file, batch_size=1, once=True)
+            self.assertEqual([certificate.name for certificate in self.downstream.certificates()], ['base'])
+            self.assertEqual(self.downstream.retrieve('alib', 'alib-0.0.1-py3-none-any.whl').file_content, first)
+            cursor: str = load_cursor(self.cursor_file)
+
+            second: bytes = self.store('blib', '0.0.1')
+            follow(self.downstream, url, self.cursor_file, once=True)
+            self.assertNotEqual(load_cursor(self.cursor_file), cursor)
+            self.assertEqual(self.downstream.retrieve('blib', 'blib-0.0.1-py3-none-any.whl').file_content, second)
+            self.assertEqual(sorted(self.downstream.packages()), ['alib', 'blib'])
+
+            self.cursor_file.unlink()
+            follow(self.downstream, url, self.cursor_file, once=True)
+            self.assertEqual(sorted(self.downstream.packages()), ['alib', 'blib'], 'Replays have to be idempotent.')
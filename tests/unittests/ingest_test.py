@@ -0,0 +1,96 @@
+from typing import List
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.server.ingest import IngestQueue, IngestJob, PUBLISHED, REJECTED, QUEUED, FAILED, VERIFYING
+
+
+class IngestTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.staging_dir: Path = Path(self.tempdir.name)
+        self.storage: Storage = create_memory_storage(verify=False)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def stage(self, queue: IngestQueue, file: str) -> IngestJob:
+        job: IngestJob = queue.create_job('Alib', file, 'A', 'U0lH', 'sha512')
+        queue.content_path(job.job_id).write_bytes(file.encode())
+        return job
+
+    def test_ingest(self):
+        queue: IngestQueue = IngestQueue(self.storage, self.staging_dir, workers=1)
+        queue.start()
+        first: IngestJob = self.stage(queue, 'alib-0.0.1.whl')
+        queue.submit(first)
+        duplicate: IngestJob = self.stage(queue, 'alib-0.0.1.whl')
+        queue.submit(duplicate)
+        queue.shutdown()
+        self.assertEqual(queue.status(first.job_id).state, PUBLISHED)
+        self.assertEqual(queue.status(duplicate.job_id).state, REJECTED)
+        self.assertEqual(self.storage.retrieve('Alib', 'alib-0.0.1.whl').file_content, b'alib-0.0.1.whl')
+        self.assertFalse(queue.content_path(first.job_id).exists(), 'Staged content has not been removed.')
+
+    def test_resume_after_restart(self):
+        crashed: IngestQueue = IngestQueue(self.storage, self.staging_dir)
+        job: IngestJob = self.stage(crashed, 'alib-0.0.1.whl')
+        crashed.state_path(job.job_id).write_text(job.json(), encoding='utf-8')
+        self.assertEqual(crashed.status(job.job_id).state, QUEUED)
+
+        restarted: IngestQueue = IngestQueue(self.storage, self.staging_dir)
+        restarted.start()
+        restarted.shutdown()
+        self.assertEqual(restarted.status(job.job_id).state, PUBLISHED)
+        self.assertEqual(list(self.storage.packages()), ['Alib'])
+
+    def test_resume_after_crash_while_storing(self):
+        crashed: IngestQueue = IngestQueue(self.storage, self.staging_dir)
+        stored: IngestJob = self.stage(crashed, 'alib-0.0.1.whl').copy(update=dict(state=VERIFYING))
+        crashed.state_path(stored.job_id).write_text(stored.json(), encoding='utf-8')
+        self.storage.store(
+            PackageData(
+                package_name='Alib', file_name='alib-0.0.1.whl', file_content=b'alib-0.0.1.whl', signature=b'SIG',
+                certificate='A'
+            )
+        )
+        conflicting: IngestJob = self.stage(crashed, 'alib-0.0.1.whl').copy(update=dict(state=VERIFYING))
+        crashed.content_path(conflicting.job_id).write_bytes(b'other')
+        crashed.state_path(conflicting.job_id).write_text(conflicting.json(), encoding='utf-8')
+
+        restarted: IngestQueue = IngestQueue(self.storage, self.staging_dir, workers=1)
+        restarted.start()
+        restarted.shutdown()
+        self.assertEqual(restarted.status(stored.job_id).state, PUBLISHED)
+        self.assertEqual(restarted.status(conflicting.job_id).state, REJECTED)
+
+    def test_retry_on_storage_error(self):
+        failures: List[int] = [1]
+
+        def store(package: PackageData) -> None:
+            if failures[0]:
+                failures[0] -= 1
+                raise RuntimeError('database is locked')
+            self.storage.store(package)
+
+        queue: IngestQueue = IngestQueue(self.storage.copy(update=dict(store=store)), self.staging_dir, workers=1)
+        with patch('rasierwasser.server.ingest.RETRY_DELAY', 0):
+            queue.start()
+            retried: IngestJob = self.stage(queue, 'alib-0.0.1.whl')
+            queue.submit(retried)
+            queue.shutdown()
+            self.assertEqual(queue.status(retried.job_id).state, PUBLISHED)
+
+            failures[0] = 10
+            queue.start()
+            failed: IngestJob = self.stage(queue, 'alib-0.0.2.whl')
+            queue.submit(failed)
+            queue.shutdown()
+        self.assertEqual(queue.status(failed.job_id).state, FAILED)
+        self.assertEqual(queue.status(failed.job_id).detail, 'database is locked')
+        self.assertFalse(queue.content_path(failed.job_id).exists(), 'Staged content has not been removed.')
@@ -0,0 +1,91 @@
+from typing import List
+from pathlib import Path
+from datetime import datetime
+from hashlib import sha512
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from atexit import unregister
+from rasierwasser.storage.algebra import CertificateData, PackageData, PackageActivity, PACKAGE_CHANGE
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage, MemoryState, save_snapshot, load_snapshot
+
+
+class MemoryEngineTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.storage: Storage = create_memory_storage(verify=False)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def store(self, package: str, file: str) -> PackageData:
+        data: PackageData = PackageData(
+            package_name=package, file_name=file, file_content=file.encode(), signature=b'SIG', certificate='A'
+        )
+        self.storage.store(data)
+        return data
+
+    def test_certificate_handling(self):
+        certificates: List[CertificateData] = list(self.storage.certificates())
+        self.assertEqual([certificate.name for certificate in certificates], ['A'])
+        self.assertRaises(
+            FileExistsError, lambda: self.storage.add_certificate(CertificateData(name='A', public_key=b'B'))
+        )
+
+    def test_file_handling(self):
+        package: PackageData = self.store('Alib', 'alib-0.0.1.whl')
+        self.assertEqual(list(self.storage.packages()), ['Alib'])
+        self.assertEqual(self.storage.retrieve('Alib', 'alib-0.0.1.whl').file_content, package.file_content)
+        self.assertEqual(b''.join(self.storage.stream('Alib', 'alib-0.0.1.whl')), package.file_content)
+        self.assertEqual(
+            [(file.file_name, file.content_sha512) for file in self.storage.index('Alib')],
+            [('alib-0.0.1.whl', sha512(package.file_content).hexdigest())]
+        )
+        self.assertRaises(FileExistsError, lambda: self.store('Alib', 'alib-0.0.1.whl'))
+        self.assertRaises(FileNotFoundError, lambda: self.storage.retrieve('Alib', 'alib-0.0.2.whl'))
+
+    def test_package_activities(self):
+        self.store('Alib', 'alib-0.0.1.whl')
+        middle: datetime = datetime.utcnow()
+        self.store('Blib', 'blib-0.0.1.whl')
+        self.store('Alib', 'alib-0.0.2.whl')
+        activities: List[PackageActivity] = list(self.storage.package_activities(middle, datetime.max))
+        self.assertEqual([activity.file for activity in activities], ['alib-0.0.2.whl', 'blib-0.0.1.whl'])
+
+    def test_change_feed(self):
+        self.store('Alib', 'alib-0.0.1.whl')
+        feed = self.storage.changes('1', 10)
+        self.assertEqual([(change.kind, change.signature) for change in feed.changes], [(PACKAGE_CHANGE, b'SIG')])
+        self.assertEqual(self.storage.changes(feed.cursor, 10).changes, [])
+
+    def test_snapshot(self):
+        snapshot: Path = Path(self.tempdir.name).joinpath('memory.snapshot')
+        state: MemoryState = MemoryState()
+        state.certificates['A'] = CertificateData(name='A', public_key=b'A')
+        save_snapshot(state, snapshot)
+        storage: Storage = create_memory_storage(verify=False, snapshot=str(snapshot))
+        self.addCleanup(unregister, save_snapshot)
+        self.assertEqual([certificate.name for certificate in storage.certificates()], ['A'])
+        self.assertEqual(load_snapshot(snapshot).certificates, state.certificates)
+
+    def test_compromise_certificate(self):
+        self.storage.add_certificate(CertificateData(name='B', public_key=b'B'))
+        self.store('Alib', 'alib-0.0.1.whl')
+        self.store('Blib', 'blib-0.0.1.whl')
+        self.storage.store(
+            PackageData(
+                package_name='Alib', file_name='alib-0.0.2.whl', file_content=b'B', signature=b'SIG', certificate='B'
+            )
+        )
+        self.assertEqual(self.storage.compromise_certificate('A', datetime.utcnow()), 2)
+        self.assertEqual(list(self.storage.packages()), ['Alib'])
+        self.assertEqual([file.file_name for file in self.storage.index('Alib')], ['alib-0.0.2.whl'])
+        self.assertRaises(FileNotFoundError, lambda: self.storage.retrieve('Alib', 'alib-0.0.1.whl'))
+        self.assertRaises(FileExistsError, lambda: self.store('Alib', 'alib-0.0.1.whl'))
+        self.assertIsNotNone([c for c in self.storage.certificates() if c.name == 'A'][0].compromised)
+        self.assertEqual(
+            [activity.file for activity in self.storage.package_activities(datetime.min, datetime.max)],
+            ['alib-0.0.2.whl']
+        )
+        self.assertRaises(FileNotFoundError, lambda: self.storage.compromise_certificate('C', datetime.utcnow()))
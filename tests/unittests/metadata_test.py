@@ -0,0 +1,48 @@
+from typing import Dict, List
+from json import loads
+from base64 import b64decode
+from hashlib import sha512
+from unittest import TestCase
+from requests import get
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.server.fastapi.fastapi import create_fastapi_server
+from server_helper import RunningServer
+
+
+FILES: List[str] = ['alib-0.0.1.whl', 'alib-0.0.2.whl']
+
+
+class MetadataTest(TestCase):
+
+    def setUp(self) -> None:
+        self.storage: Storage = create_memory_storage(verify=False)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        for file in FILES:
+            self.storage.store(
+                PackageData(
+                    package_name='Alib', file_name=file, file_content=file.encode(), signature=b'S', certificate='A'
+                )
+            )
+
+    def test_metadata(self):
+        with RunningServer(create_fastapi_server(self.storage)) as url:
+            with get(f'{url}/metadata/Alib') as response:
+                files: List[Dict[str, str]] = response.json()
+        self.assertEqual(sorted(file['filename'] for file in files), FILES)
+        self.assertTrue(all('content_base64' not in file for file in files), 'Content is served by default.')
+        self.assertEqual(
+            dict((file['filename'], file['content_sha512']) for file in files),
+            dict((file, sha512(file.encode()).hexdigest()) for file in FILES)
+        )
+
+    def test_metadata_with_content(self):
+        with RunningServer(create_fastapi_server(self.storage)) as url:
+            with get(f'{url}/metadata/Alib', params=dict(content='true')) as response:
+                self.assertEqual(response.headers['content-type'], 'application/x-ndjson')
+                lines: List[str] = response.text.splitlines()
+        files: List[Dict[str, str]] = [loads(line) for line in lines]
+        self.assertEqual(sorted(file['filename'] for file in files), FILES)
+        for file in files:
+            self.assertEqual(b64decode(file['content_base64']), file['filename'].encode())
+            self.assertEqual(file['content_sha512'], sha512(file['filename'].encode()).hexdigest())
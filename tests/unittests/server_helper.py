@@ -0,0 +1,30 @@
+from typing import Optional
+from socket import socket
+from threading import Thread
+from time import sleep
+from uvicorn import Config, Server
+from starlette.types import ASGIApp
+
+
+class RunningServer:
+    """
+    Serves an application on a free local port in a background thread for the duration of a with block.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        with socket() as probe:
+            probe.bind(('localhost', 0))
+            self.port: int = probe.getsockname()[1]
+        self.server: Server = Server(Config(app, host='localhost', port=self.port, log_level='warning'))
+        self.thread: Optional[Thread] = None
+
+    def __enter__(self) -> str:
+        self.thread = Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            sleep(0.01)
+        return f'http://localhost:{self.port}'
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.server.should_exit = True
+        self.thread.join()
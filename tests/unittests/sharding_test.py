@@ -0,0 +1,105 @@
+from typing import List
+from datetime import datetime
+from unittest import TestCase
+from rasierwasser.storage.algebra import CertificateData, PackageData, DownloadCount, CERTIFICATE_CHANGE, PACKAGE_CHANGE
+from rasierwasser.storage.memory.engine import create_memory_storage
+from rasierwasser.storage.sharding import create_sharded_storage, rebalance_shards, shard_index, Storage
+
+
+PACKAGES: List[str] = [f'lib{number}' for number in range(12)]
+
+
+class ShardingTest(TestCase):
+
+    def setUp(self) -> None:
+        self.shards: List[Storage] = [create_memory_storage(verify=False) for _ in range(3)]
+        self.storage: Storage = create_sharded_storage(self.shards[:2], workers=2)
+        self.storage.add_certificate(CertificateData(name='A', public_key=b'A'))
+        for package in PACKAGES:
+            self.storage.store(
+                PackageData(
+                    package_name=package, file_name=f'{package}-0.0.1.whl', file_content=package.encode(),
+                    signature=b'S', certificate='A'
+                )
+            )
+
+    def test_routing(self):
+        for package in PACKAGES:
+            self.assertIn(package, self.shards[shard_index(package, 2)].packages())
+            self.assertEqual(self.storage.retrieve(package, f'{package}-0.0.1.whl').file_content, package.encode())
+        self.assertEqual(sorted(self.storage.packages()), sorted(PACKAGES))
+        self.assertTrue(all(shard.packages() for shard in self.shards[:2]), 'Packages have not been distributed.')
+
+    def test_certificates_are_replicated(self):
+        self.assertEqual([[c.name for c in shard.certificates()] for shard in self.shards[:2]], [['A'], ['A']])
+
+    def test_package_activities(self):
+        activities = list(self.storage.package_activities(datetime.min, datetime.max))
+        self.assertEqual(sorted(activity.package for activity in activities), sorted(PACKAGES))
+        times: List[datetime] = [activity.upload_time for activity in activities]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    def test_download_statistics(self):
+        hour: datetime = datetime(2021, 6, 1, 12)
+        self.storage.record_downloads([DownloadCount(package, f'{package}-0.0.1.whl', hour, 1) for package in PACKAGES])
+        self.assertEqual(
+            [count.package for count in self.storage.download_statistics(datetime.min, datetime.max, None)],
+            sorted(PACKAGES)
+        )
+        self.assertEqual(
+            list(self.storage.download_statistics(datetime.min, datetime.max, 'lib3')),
+            [DownloadCount('lib3', 'lib3-0.0.1.whl', hour, 1)]
+        )
+
+    def test_change_feed(self):
+        kinds: List[str] = []
+        cursor: str = ''
+        while (feed := self.storage.changes(cursor, 1)).changes:
+            kinds.extend(change.kind for change in feed.changes)
+            cursor = feed.cursor
+        self.assertEqual(kinds, [CERTIFICATE_CHANGE] + [PACKAGE_CHANGE] * len(PACKAGES))
+        self.assertRaises(ValueError, lambda: self.storage.changes('1.1.1', 5))
+
+    def test_rebalance(self):
+        moved: int = sum(files for _, _, _, files in rebalance_shards(self.shards, 2))
+        self.assertEqual(moved, sum(1 for package in PACKAGES if shard_index(package, 3) != shard_index(package, 2)))
+        storage: Storage = create_sharded_storage(self.shards, workers=2)
+        self.assertEqual(sorted(storage.packages()), sorted(PACKAGES))
+        for package in PACKAGES:
+            shard: Storage = self.shards[shard_index(package, 3)]
+            self.assertEqual(shard.retrieve(package, f'{package}-0.0.1.whl').file_content, package.encode())
+        self.assertEqual([certificate.name for certificate in self.shards[2].certificates()], ['A'])
+
+    def test_rebalance_keeps_upload_times_and_quarantine(self):
+        moving: str = next(package for package in PACKAGES if shard_index(package, 3) != shard_index(package, 2))
+        self.storage.add_certificate(CertificateData(name='B', public_key=b'B'))
+        self.storage.store(
+            PackageData(
+                package_name=moving, file_name=f'{moving}-0.0.2.whl', file_content=b'B', signature=b'S',
+                certificate='B'
+            )
+        )
+        self.storage.compromise_certificate('B', datetime.utcnow())
+        activities = sorted(self.storage.package_activities(datetime.min, datetime.max))
+        for _ in rebalance_shards(self.shards, 2):
+            pass
+        storage: Storage = create_sharded_storage(self.shards, workers=2)
+        self.assertEqual(sorted(storage.package_activities(datetime.min, datetime.max)), activities)
+        for position, shard in enumerate(self.shards):
+            self.assertTrue(all(shard_index(package, 3) == position for package, _ in shard.stored_files()))
+        self.assertIsNotNone(storage.read_stored_file(moving, f'{moving}-0.0.2.whl').quarantined)
+        self.assertRaises(FileNotFoundError, lambda: storage.retrieve(moving, f'{moving}-0.0.2.whl'))
+
+    def test_change_feed_after_appending_shard(self):
+        cursor: str = self.storage.changes('', 100).cursor
+        self.assertEqual(self.storage.changes(cursor, 100).changes, [])
+        for _ in rebalance_shards(self.shards, 2):
+            pass
+        storage: Storage = create_sharded_storage(self.shards, workers=2)
+        feed = storage.changes(cursor, 100)
+        self.assertEqual(
+            sorted(change.package for change in feed.changes if change.kind == PACKAGE_CHANGE),
+            sorted(package for package in PACKAGES if shard_index(package, 3) != shard_index(package, 2)),
+            'Moved files have not been replicated.'
+        )
+        self.assertEqual(len(feed.cursor.split('.')), 3)
@@ -0,0 +1,86 @@
+from typing import Dict, List
+from io import BytesIO
+from json import load
+from base64 import b64decode
+from hashlib import sha512
+from pathlib import Path
+from zipfile import ZipFile
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from OpenSSL.crypto import PKey, X509, TYPE_RSA, FILETYPE_PEM, dump_privatekey, dump_certificate
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.validation import verify_package_data
+from rasierwasser.helper.signing import sign_batch, CONFIG_FILE_NAME, MANIFEST_FILE_NAME, SIGNATURE_SUFFIX
+from rasierwasser.helper.upload import collect_uploads
+
+
+def create_certificate(key: PKey) -> bytes:
+    certificate: X509 = X509()
+    certificate.get_subject().CN = 'signing-test'
+    certificate.set_serial_number(1)
+    certificate.gmtime_adj_notBefore(0)
+    certificate.gmtime_adj_notAfter(3600)
+    certificate.set_issuer(certificate.get_subject())
+    certificate.set_pubkey(key)
+    certificate.sign(key, 'sha512')
+    return dump_certificate(FILETYPE_PEM, certificate)
+
+
+class SigningTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.root: Path = Path(self.tempdir.name)
+        key: PKey = PKey()
+        key.generate_key(TYPE_RSA, 2048)
+        self.root.joinpath('key.pem').write_bytes(dump_privatekey(FILETYPE_PEM, key, 'aes256', b'TEST'))
+        self.certificate: CertificateData = CertificateData(name='throwaway', public_key=create_certificate(key))
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def create_project(self, package: str, versions: List[str]) -> List[Path]:
+        project: Path = self.root.joinpath('projects', package)
+        project.joinpath('dist').mkdir(parents=True)
+        project.joinpath(CONFIG_FILE_NAME).write_text(
+            f'keyfile: ../../key.pem\ncertificate: {self.certificate.name}\n', encoding='utf-8'
+        )
+        wheels: List[Path] = []
+        for version in versions:
+            wheel: Path = project.joinpath('dist', f'{package}-{version}-py3-none-any.whl')
+            buffer: BytesIO = BytesIO()
+            with ZipFile(buffer, 'w') as archive:
+                archive.writestr(f'{package}/__init__.py', f'VERSION = "{version}"\n')
+            wheel.write_bytes(buffer.getvalue())
+            wheels.append(wheel)
+        return wheels
+
+    def test_sign_batch(self):
+        wheels: List[Path] = self.create_project('alib', ['0.0.1', '0.0.2']) + self.create_project('blib', ['1.0.0'])
+        manifest: Path = self.root.joinpath(MANIFEST_FILE_NAME)
+        sign_batch(self.root.joinpath('projects'), manifest, password='TEST', processes=1)
+
+        for wheel in wheels:
+            with wheel.with_name(f'{wheel.name}{SIGNATURE_SUFFIX}').open('r', encoding='utf-8') as src:
+                detached: Dict[str, str] = load(src)
+            verify_package_data(
+                PackageData(
+                    package_name=detached['package'], file_name=detached['filename'],
+                    file_content=wheel.read_bytes(), signature=b64decode(detached['signature_base64']),
+                    certificate=detached['certificate'], digest=detached['hash_algorithm']
+                ),
+                self.certificate
+            )
+
+        with manifest.open('r', encoding='utf-8') as src:
+            entries: List[Dict[str, str]] = load(src)
+        self.assertEqual(
+            sorted((entry['path'], entry['content_sha512']) for entry in entries),
+            sorted((str(wheel), sha512(wheel.read_bytes()).hexdigest()) for wheel in wheels)
+        )
+        self.assertEqual(
+            sorted((entry['package'], entry['filename']) for entry in entries),
+            [('alib', 'alib-0.0.1-py3-none-any.whl'), ('alib', 'alib-0.0.2-py3-none-any.whl'),
+             ('blib', 'blib-1.0.0-py3-none-any.whl')]
+        )
+        self.assertEqual(collect_uploads([str(manifest)]), entries)
@@ -0,0 +1,48 @@
+from typing import List
+from unittest import TestCase
+from threading import Event
+from time import sleep
+from concurrent.futures import ThreadPoolExecutor, Future
+from rasierwasser.storage.coalescing import SingleFlight
+
+
+class SingleFlightTest(TestCase):
+
+    def setUp(self) -> None:
+        self.flight: SingleFlight = SingleFlight()
+        self.release: Event = Event()
+        self.calls: List[str] = []
+
+    def slow_call(self, result: object) -> object:
+        self.calls.append('call')
+        self.release.wait(5)
+        return result
+
+    def run_concurrently(self, function, waiters: int = 8) -> List[Future]:
+        with ThreadPoolExecutor(max_workers=waiters) as pool:
+            futures: List[Future] = [pool.submit(self.flight.do, 'key', function) for _ in range(waiters)]
+            while not self.calls:
+                sleep(0.01)
+            sleep(0.2)
+            self.release.set()
+        return futures
+
+    def test_concurrent_calls_share_result(self):
+        result: object = object()
+        futures: List[Future] = self.run_concurrently(lambda: self.slow_call(result))
+        self.assertTrue(all(future.result() is result for future in futures), 'Waiters got different results.')
+        self.assertEqual(len(self.calls), 1, f'Too many backend calls: {len(self.calls)}')
+
+    def test_concurrent_calls_share_error(self):
+        def failing_call():
+            self.slow_call(None)
+            raise FileNotFoundError('missing')
+
+        futures: List[Future] = self.run_concurrently(failing_call)
+        self.assertTrue(all(isinstance(future.exception(), FileNotFoundError) for future in futures))
+
+    def test_finished_calls_are_not_cached(self):
+        self.release.set()
+        self.flight.do('key', lambda: self.slow_call(1))
+        self.flight.do('key', lambda: self.slow_call(2))
+        self.assertEqual(len(self.calls), 2)
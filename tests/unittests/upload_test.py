@@ -0,0 +1,151 @@
+from typing import Dict, List, Tuple, Optional
+from io import BytesIO
+from base64 import b64encode
+from pathlib import Path
+from zipfile import ZipFile
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from tempfile import TemporaryDirectory
+from requests import get, put, post, Response
+from OpenSSL.crypto import load_privatekey, sign, FILETYPE_PEM, PKey
+from rasierwasser.storage.algebra import CertificateData, PackageData
+from rasierwasser.storage.memory.engine import create_memory_storage, Storage
+from rasierwasser.storage.validation import get_normalised_package_content
+from rasierwasser.server.fastapi.fastapi import create_fastapi_server
+from rasierwasser.server.ingest import PUBLISHED, PENDING_STATES
+from rasierwasser.configuration.server import ServerConfig, IngestConfig
+from rasierwasser.helper.upload import upload_file, upload_files, UPLOADED, SKIPPED, CONFLICT, FAILED
+from server_helper import RunningServer
+
+
+def build_wheel(package: str, version: str) -> bytes:
+    buffer: BytesIO = BytesIO()
+    with ZipFile(buffer, 'w') as wheel:
+        wheel.writestr(f'{package}/__init__.py', f'VERSION = "{version}"\n')
+    return buffer.getvalue()
+
+
+def response(status_code: int, **headers: str) -> Response:
+    result: Response = Response()
+    result.status_code = status_code
+    result.headers.update(headers)
+    result._content = b'{"detail": "busy"}'
+    result.raw = BytesIO()
+    return result
+
+
+class UploadTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        data_dir: Path = Path(__file__).parent.joinpath('data', 'signing')
+        self.private_key: PKey = load_privatekey(FILETYPE_PEM, data_dir.joinpath('key.pem').read_bytes(), b'TEST')
+        self.storage: Storage = create_memory_storage(verify=True)
+        self.storage.add_certificate(
+            CertificateData(name='base', public_key=data_dir.joinpath('cert.pem').read_bytes())
+        )
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def signature(self, content: bytes) -> bytes:
+        return sign(self.private_key, get_normalised_package_content(content), 'sha512')
+
+    def put_wheel(self, url: str, package: str, content: bytes, signature: bytes) -> Response:
+        return put(
+            f'{url}/packages/{package}/{package}-0.0.1-py3-none-any.whl',
+            data=content,
+            headers={
+                'X-Rasierwasser-Certificate': 'base',
+                'X-Rasierwasser-Signature': b64encode(signature).decode('ascii')
+            }
+        )
+
+    def upload_entry(self, package: str, content: bytes, signature: bytes) -> Dict[str, str]:
+        path: Path = Path(self.tempdir.name).joinpath(f'{package}-0.0.1-py3-none-any.whl')
+        path.write_bytes(content)
+        return dict(
+            package=package, filename=path.name, path=str(path), certificate='base',
+            signature_base64=b64encode(signature).decode('ascii')
+        )
+
+    def test_put_endpoint(self):
+        content: bytes = build_wheel('alib', '0.0.1')
+        with RunningServer(create_fastapi_server(self.storage)) as url:
+            self.assertEqual(self.put_wheel(url, 'alib', content, self.signature(content)).status_code, 201)
+            self.assertEqual(self.put_wheel(url, 'alib', content, self.signature(content)).status_code, 409)
+            self.assertEqual(self.put_wheel(url, 'blib', content, b'invalid').status_code, 422)
+            with post(
+                f'{url}/packages',
+                json=dict(
+                    package='clib', filename='clib-0.0.1-py3-none-any.whl', content_base64='!!!notb64x',
+                    certificate='base', signature_base64='U0lH'
+                )
+            ) as response:
+                self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.storage.retrieve('alib', 'alib-0.0.1-py3-none-any.whl').file_content, content)
+        self.assertEqual(sorted(self.storage.packages()), ['alib'])
+
+    def test_ingest_endpoints(self):
+        content: bytes = build_wheel('alib', '0.0.1')
+        server_config: ServerConfig = ServerConfig(
+            hostname='localhost', port=0,
+            ingest=IngestConfig(staging_dir=str(Path(self.tempdir.name).joinpath('staging')), workers=1)
+        )
+        with RunningServer(create_fastapi_server(self.storage, server_config=server_config)) as url:
+            response: Response = self.put_wheel(url, 'alib', content, self.signature(content))
+            self.assertEqual(response.status_code, 202)
+            job_id: str = response.json()['job_id']
+            while (state := get(f'{url}/jobs/{job_id}').json()['state']) in PENDING_STATES:
+                sleep(0.01)
+            self.assertEqual(state, PUBLISHED)
+            with post(
+                f'{url}/packages',
+                json=dict(
+                    package='blib', filename='blib-0.0.1-py3-none-any.whl', content_base64='!!!notb64x',
+                    certificate='base', signature_base64='U0lH'
+                )
+            ) as invalid:
+                self.assertEqual(invalid.status_code, 422)
+        self.assertEqual(self.storage.retrieve('alib', 'alib-0.0.1-py3-none-any.whl').file_content, content)
+
+    def test_upload_files(self):
+        for package in ('alib', 'blib'):
+            content: bytes = build_wheel(package, '0.0.1')
+            self.storage.store(
+                PackageData(
+                    package_name=package, file_name=f'{package}-0.0.1-py3-none-any.whl', file_content=content,
+                    signature=self.signature(content), certificate='base'
+                )
+            )
+        uploads: List[Dict[str, str]] = [
+            self.upload_entry('alib', build_wheel('alib', '0.0.1'), b'S'),
+            self.upload_entry('blib', build_wheel('blib', '0.0.2'), b'S'),
+            self.upload_entry('clib', build_wheel('clib', '0.0.1'), b'invalid'),
+            self.upload_entry('dlib', build_wheel('dlib', '0.0.1'), self.signature(build_wheel('dlib', '0.0.1')))
+        ]
+        with RunningServer(create_fastapi_server(self.storage)) as url:
+            outcomes: Dict[str, Tuple[str, Optional[str]]] = dict(
+                (upload['package'], (outcome, detail)) for upload, outcome, detail in upload_files(url, uploads)
+            )
+        self.assertEqual(
+            dict((package, outcome) for package, (outcome, _) in outcomes.items()),
+            dict(alib=SKIPPED, blib=CONFLICT, clib=FAILED, dlib=UPLOADED)
+        )
+        self.assertTrue(outcomes['clib'][1].startswith('422'), f'Server detail is missing: {outcomes["clib"]}')
+        self.assertEqual(sorted(self.storage.packages()), ['alib', 'blib', 'dlib'])
+
+    def test_retry_after_rejection(self):
+        session: MagicMock = MagicMock()
+        session.put.side_effect = [response(503, **{'Retry-After': '2'}), response(429), response(201)]
+        upload: Dict[str, str] = self.upload_entry('alib', b'wheel', b'S')
+        with patch('rasierwasser.helper.upload.sleep') as sleep:
+            self.assertEqual(upload_file(session, 'http://localhost', upload, dict(alib=dict())), (UPLOADED, None))
+        self.assertEqual([call.args for call in sleep.call_args_list], [(2, ), (1, )])
+
+        session.put.side_effect = [response(503)] * 5
+        with patch('rasierwasser.helper.upload.sleep'):
+            self.assertEqual(
+                upload_file(session, 'http://localhost', upload, dict(alib=dict())), (FAILED, '503: busy')
+            )